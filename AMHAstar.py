@@ -11,15 +11,23 @@ def valid_weight(weight):
     w1, w2 = weight
     return w1 >=1 and w2 >= 1
 
-def anytime(grid, start, goal, h, weight, update, valid, time):
+def anytime(grid, start, goal, h, weight, update, valid, time, backend="node", incumbent=None, deadline=None):
     best_path = None
     best_cost = math.inf
     best_open = None
     best_close = None
 
+    lower = start.g_score + h[0](start.state, goal)
+    if incumbent is not None:
+        incumbent.raise_lower(lower)
+
     while valid(weight) and time > 0:
+        if deadline is not None and deadline.check():
+            break
         time -= 1
-        path, open_set, closed_set, path_cost = MH.smha_star(grid, start, goal, h, weight)
+        path, open_set, closed_set, path_cost = MH.smha_star(grid, start, goal, h, weight, backend, incumbent, deadline)
+        if path is None and deadline is not None and deadline.passed:
+            break
 
         if path is not None:
             if path_cost < best_cost:
@@ -27,11 +35,21 @@ def anytime(grid, start, goal, h, weight, update, valid, time):
                 best_cost = path_cost
                 best_open = open_set
                 best_close = closed_set
+                if incumbent is not None:
+                    incumbent.offer(path_cost, path)
+            # An SMHA* pass finds a path within w1 * w2 of optimal.
+            lower = max(lower, path_cost / (weight[0] * weight[1]))
+            if incumbent is not None:
+                incumbent.raise_lower(lower)
             weight = update(weight)
-        else:
+        elif incumbent is None or update(weight) == weight:
             break 
+        else:
+            # Pruned against the incumbent, a weighted search can miss a cheaper path
+            # that lower weights still find.
+            weight = update(weight)
 
-    return best_path, best_open, best_close, best_cost
+    return Util.AnytimeResult(best_path, best_open, best_close, best_cost, lower)
 
 if __name__ == "__main__":
     width, height = 20, 20
@@ -3,27 +3,36 @@ import Util
 import potential as pt
 import heuristics as heu
 
-def anytime_potential_search(grid, start, goal, initial_budget, cost_model, h, epsilon, time):
+def anytime_potential_search(grid, start, goal, initial_budget, cost_model, h, epsilon, time, incumbent=None, deadline=None):
     best_path = None
     best_cost = math.inf
     best_open = None
     best_close = None
     budget = initial_budget
 
+    # Potential search proves nothing tighter than the admissible estimate at the start.
+    lower = start.g_score + h(start.state, goal)
+    if incumbent is not None:
+        incumbent.raise_lower(lower)
+
     while budget > 0 and time > 0:
+        if deadline is not None and deadline.check():
+            break
         time -= 1
-        path, open_set, closed_set, path_cost = pt.potential_search(grid, start, goal, budget, cost_model, h)
+        path, open_set, closed_set, path_cost = pt.potential_search(grid, start, goal, budget, cost_model, h, incumbent, deadline)
 
         if path is not None and path_cost < best_cost:
             best_path = path
             best_cost = path_cost
             best_open = open_set
             best_close = closed_set
+            if incumbent is not None:
+                incumbent.offer(path_cost, path)
             budget = path_cost - epsilon 
         else:
             break 
 
-    return best_path, best_open, best_close, best_cost
+    return Util.AnytimeResult(best_path, best_open, best_close, best_cost, lower)
 
 if __name__ == "__main__":
     width, height = 20, 20
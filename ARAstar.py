@@ -1,11 +1,25 @@
 import math
 import Util
 import heuristics as heu
+import ArraySearch
+import HPA
 
-def ARA_star(grid, start, goal, h, weight, epsilon, time):
+def ARA_star(grid, start, goal, h, weight, epsilon, time, backend="node", incumbent=None, deadline=None):
+    if backend == "array":
+        return ArraySearch.ARA_star(grid, start, goal, h, weight, epsilon, time, incumbent, deadline)
+    if backend == "hpa":
+        # One abstract search: the abstraction, not the weight, bounds the path cost.
+        path, open_set, closed_set, cost = HPA.A_star(grid, start, goal, h, 1, incumbent, deadline)
+        return Util.AnytimeResult(path, open_set, closed_set, math.inf if cost is None else cost,
+                                  start.g_score + h(start.state, goal))
+    if not grid.path_exists(start, goal):
+        return Util.AnytimeResult(None, {start.state}, set(), math.inf, 0)
+    if hasattr(h, "table"):
+        # Heuristics that keep their own tables see one request per search this way.
+        h = heu.Lookup(h, grid.grid.shape)
     open_set = set()
     open_set.add(start.state)
-    open_list = Util.PQ()
+    open_list = Util.IndexedPQ()
     open_list.push((start), 0)
     closed_set = set()
     incons_set = set()
@@ -14,13 +28,31 @@ def ARA_star(grid, start, goal, h, weight, epsilon, time):
     g_scores = {start.state: 0}
     g_scores[goal] = float('inf')
 
+    lower = start.g_score + h(start.state, goal)
+    if incumbent is not None:
+        incumbent.raise_lower(lower)
+
     while weight >= 1 and time > 0:
+        if deadline is not None and deadline.check():
+            break
         time -= 1
-        path, path_cost = improved_A_star(grid, start, goal, h, weight, open_list, g_scores, closed_set, incons_set, open_set)
+        path, path_cost = improved_A_star(grid, start, goal, h, weight, open_list, g_scores, closed_set, incons_set, open_set, incumbent, deadline)
         if path != None:
             if path_cost < best_cost:
                 best_path = path
                 best_cost = path_cost
+                if incumbent is not None:
+                    incumbent.offer(path_cost, path)
+        if deadline is not None and deadline.passed:
+            # Out of budget: return now rather than bound and re-key the frontier.
+            break
+        # ARA*'s bound: no path is cheaper than the least g + h over OPEN and INCONS,
+        # except through states pruned against the incumbent.
+        frontier = [entry[2].state for entry in open_list.heap] + [node.state for node in incons_set]
+        cap = best_cost if incumbent is None else min(best_cost, incumbent.cost)
+        lower = max(lower, min([g_scores[s] + h(s, goal) for s in frontier] + [cap]))
+        if incumbent is not None:
+            incumbent.raise_lower(lower)
         weight = max(1, weight - epsilon)
         for node in incons_set:
             open_list.update((node), g_scores[node.state] + weight * h(node.state, goal))
@@ -28,10 +60,12 @@ def ARA_star(grid, start, goal, h, weight, epsilon, time):
         incons_set.clear()
         closed_set.clear()
     
-    return best_path, open_set, closed_set, best_cost
+    return Util.AnytimeResult(best_path, open_set, closed_set, best_cost, lower)
 
-def improved_A_star(grid, start, goal, h, weight, open_list, g_scores, closed_set, incons_set, open_set):
+def improved_A_star(grid, start, goal, h, weight, open_list, g_scores, closed_set, incons_set, open_set, incumbent=None, deadline=None):
     while not open_list.isEmpty():
+        if deadline is not None and deadline.expired():
+            break
         current_node = open_list.pop()
         closed_set.add(current_node.state)
         open_set.remove(current_node.state)
@@ -50,6 +84,8 @@ def improved_A_star(grid, start, goal, h, weight, open_list, g_scores, closed_se
             g_score = neighbor.g_score
             
             if g_score < g_scores.get(neighbor.state, math.inf):
+                if incumbent is not None and g_score + h(neighbor.state, goal) >= incumbent.cost:
+                    continue
                 g_scores[neighbor.state] = g_score
                 if neighbor.state not in closed_set:
                     f_score = g_score + weight * h(neighbor.state, goal)
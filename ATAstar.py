@@ -3,15 +3,23 @@ import Util
 import Astar
 import heuristics as heu
 
-def anytime_A_star(grid, start, goal, h, weight, epsilon, time):
+def anytime_A_star(grid, start, goal, h, weight, epsilon, time, backend="node", incumbent=None, deadline=None):
     best_path = None
     best_cost = math.inf
     best_open = None
     best_close = None
 
+    lower = start.g_score + h(start.state, goal)
+    if incumbent is not None:
+        incumbent.raise_lower(lower)
+
     while weight >= 1 and time > 0:
+        if deadline is not None and deadline.check():
+            break
         time -= 1
-        path, open_set, closed_set, path_cost = Astar.A_star(grid, start, goal, h, weight)
+        path, open_set, closed_set, path_cost = Astar.A_star(grid, start, goal, h, weight, backend, incumbent, deadline)
+        if path is None and deadline is not None and deadline.passed:
+            break
 
         if path is not None:
             if path_cost < best_cost:
@@ -19,13 +27,23 @@ def anytime_A_star(grid, start, goal, h, weight, epsilon, time):
                 best_cost = path_cost
                 best_open = open_set
                 best_close = closed_set
+                if incumbent is not None:
+                    incumbent.offer(path_cost, path)
+            # A weighted pass finds a path within weight of optimal.
+            lower = max(lower, path_cost / weight)
+            if incumbent is not None:
+                incumbent.raise_lower(lower)
             if weight == 1:
                 break
             weight = max(1, weight - epsilon) 
-        else:
+        elif incumbent is None or weight == 1:
             break 
+        else:
+            # Pruned against the incumbent without reopening, a weighted search can miss
+            # a cheaper path that a lower weight still finds.
+            weight = max(1, weight - epsilon)
 
-    return best_path, best_open, best_close, best_cost
+    return Util.AnytimeResult(best_path, best_open, best_close, best_cost, lower)
 
 if __name__ == "__main__":
     width, height = 20, 20
@@ -0,0 +1,351 @@
+import math
+import heapq
+from array import array
+import numpy as np
+import heuristics as heu
+import Util
+
+# Array-backed search kernels. States are flat cell ids (x * width + y) and all
+# per-state bookkeeping lives in preallocated buffers indexed by id, so no Node
+# objects are created while searching.
+
+NEW, OPEN, CLOSED, INCONS = 0, 1, 2, 3
+REOPEN = bytes.maketrans(bytes([CLOSED, INCONS]), bytes([NEW, OPEN]))
+
+# Per-id buffer for grids without whole-grid tables: only the ids a search writes are
+# stored, and the rest read as default.
+class Sparse(dict):
+    def __init__(self, default):
+        super().__init__()
+        self.default = default
+
+    def __missing__(self, key):
+        return self.default
+
+class SearchSpace:
+    def __init__(self, grid):
+        size = grid.width * grid.height
+        self.grid = grid
+        self.size = size
+        self.costs = memoryview(np.ascontiguousarray(grid.grid).reshape(-1))
+        if grid.tables:
+            self.g = array('d', [math.inf]) * size
+            self.parent = array('i', [-1]) * size
+            self.status = bytearray(size)
+            if grid.adj_counts is None:
+                grid.build_adjacency()
+            degree = grid.adj_degree
+            counts = memoryview(grid.adj_counts)
+            neighbors = memoryview(grid.adj_neighbors)
+
+            def successors(u):
+                row = u * degree
+                return neighbors[row:row + counts[u]]
+            self.successors = successors
+        else:
+            # Grids opened without tables (GridFile.load) keep the search to the pages
+            # it expands, so nothing here is sized by the grid.
+            self.g = Sparse(math.inf)
+            self.parent = Sparse(-1)
+            self.status = Sparse(NEW)
+            self.successors = grid._cell_neighbors
+        self.expanded = 0
+        self.generated = 0
+        self.peak_open = 0
+
+    def record(self):
+        Util.stats.expanded += self.expanded
+        Util.stats.generated += self.generated
+        Util.stats.open_size(self.peak_open)
+
+    def heuristic(self, h, goal):
+        return heuristic_lookup(self.grid, h, goal)
+
+    def path(self, goal):
+        return Util.PathView(Util.extract_path(self.parent, goal, self.grid.width))
+
+    def flags(self):
+        """A fresh per-id byte buffer, zero everywhere."""
+        return bytearray(self.size) if self.grid.tables else Sparse(0)
+
+    def marked(self, buffer, flag):
+        if isinstance(buffer, Sparse):
+            return id_states(self.grid, [v for v, f in buffer.items() if f == flag])
+        return id_states(self.grid, np.flatnonzero(np.frombuffer(buffer, dtype=np.uint8) == flag))
+
+    def states(self, flag):
+        return self.marked(self.status, flag)
+
+    def reopen(self):
+        """CLOSED states back to NEW and INCONS ones to OPEN, between ARA* passes."""
+        status = self.status
+        if isinstance(status, Sparse):
+            for v, s in status.items():
+                if s == CLOSED:
+                    status[v] = NEW
+                elif s == INCONS:
+                    status[v] = OPEN
+        else:
+            status[:] = status.translate(REOPEN)
+
+def heuristic_lookup(grid, h, goal):
+    """h(., goal) as a function of cell id, read from a shared table when h is tabled
+    and the table fits, and computed once per cell reached otherwise."""
+    table = heu.TABLES.get(h, goal, grid.grid.shape) if heu.tabled(h) else None
+    if table is not None:
+        return memoryview(table.reshape(-1)).__getitem__
+    cache = array('d', [-1.0]) * (grid.width * grid.height) if grid.tables else Sparse(-1.0)
+    width = grid.width
+
+    def lookup(v):
+        hv = cache[v]
+        if hv < 0:
+            hv = cache[v] = h(divmod(v, width), goal)
+        return hv
+    return lookup
+
+def id_states(grid, ids):
+    xs, ys = np.divmod(np.asarray(ids, dtype=np.int64), grid.width)
+    return set(zip(xs.tolist(), ys.tolist()))
+
+def weighted_A_star(space, start, goal, h, weight, g0=0, incumbent=None, deadline=None):
+    g, parent, status, costs = space.g, space.parent, space.status, space.costs
+    successors = space.successors
+    heappush, heappop = heapq.heappush, heapq.heappop
+
+    g[start] = float(g0)
+    status[start] = OPEN
+    heap = [(0, start)]
+    # States on the open list, as opposed to heap entries, which include stale ones.
+    live = 1
+    space.peak_open = max(space.peak_open, live)
+    bound = math.inf
+    while heap:
+        _, u = heappop(heap)
+        if status[u] != OPEN:
+            continue
+        status[u] = CLOSED
+        live -= 1
+        if u == goal:
+            return True
+        if deadline is not None and deadline.expired():
+            return False
+        if incumbent is not None:
+            bound = incumbent.cost
+        gu = g[u] + costs[u]
+        succ = successors(u)
+        space.expanded += 1
+        space.generated += len(succ)
+        for v in succ:
+            if gu < g[v] and status[v] != CLOSED:
+                hv = h(v)
+                if gu + hv >= bound:
+                    continue
+                g[v] = gu
+                parent[v] = u
+                if status[v] != OPEN:
+                    status[v] = OPEN
+                    live += 1
+                heappush(heap, (gu + weight * hv, v))
+        if live > space.peak_open:
+            space.peak_open = live
+    return False
+
+def improve_path(space, heap, incons, goal, h, weight, incumbent=None, deadline=None):
+    g, parent, status, costs = space.g, space.parent, space.status, space.costs
+    successors = space.successors
+    heappush, heappop = heapq.heappush, heapq.heappop
+    bound = math.inf
+    live = len({v for _, v in heap if status[v] == OPEN})
+    space.peak_open = max(space.peak_open, live)
+
+    while heap:
+        f, u = heap[0]
+        if status[u] != OPEN:
+            heappop(heap)
+            continue
+        if g[goal] <= f:
+            return True
+        if deadline is not None and deadline.expired():
+            return False
+        heappop(heap)
+        status[u] = CLOSED
+        live -= 1
+        if incumbent is not None:
+            bound = incumbent.cost
+        gu = g[u] + costs[u]
+        succ = successors(u)
+        space.expanded += 1
+        space.generated += len(succ)
+        for v in succ:
+            if gu < g[v]:
+                if gu + h(v) >= bound:
+                    continue
+                g[v] = gu
+                parent[v] = u
+                sv = status[v]
+                if sv == CLOSED:
+                    status[v] = INCONS
+                    incons.append(v)
+                elif sv != INCONS:
+                    if sv != OPEN:
+                        status[v] = OPEN
+                        live += 1
+                    heappush(heap, (gu + weight * h(v), v))
+        if live > space.peak_open:
+            space.peak_open = live
+    return g[goal] < math.inf
+
+def A_star(grid, start, goal, h, weight, incumbent=None, deadline=None):
+    if not grid.path_exists(start, goal):
+        return None, {start.state}, set(), None
+    space = SearchSpace(grid)
+    s, t = grid.state_id(start.state), grid.state_id(goal)
+    found = weighted_A_star(space, s, t, space.heuristic(h, goal), weight, start.g_score, incumbent, deadline)
+    space.record()
+    open_set, closed_set = space.states(OPEN), space.states(CLOSED)
+    if found:
+        return space.path(t), open_set, closed_set, space.g[t]
+    return None, open_set, closed_set, None
+
+def ARA_star(grid, start, goal, h, weight, epsilon, time, incumbent=None, deadline=None):
+    if not grid.path_exists(start, goal):
+        return Util.AnytimeResult(None, {start.state}, set(), math.inf, 0)
+    space = SearchSpace(grid)
+    s, t = grid.state_id(start.state), grid.state_id(goal)
+    g, status = space.g, space.status
+    lookup = space.heuristic(h, goal)
+    g[s] = float(start.g_score)
+    status[s] = OPEN
+    heap = [(0, s)]
+    incons = []
+    best_path = None
+    best_cost = math.inf
+    lower = start.g_score + lookup(s)
+    if incumbent is not None:
+        incumbent.raise_lower(lower)
+
+    while weight >= 1 and time > 0:
+        if deadline is not None and deadline.check():
+            break
+        time -= 1
+        improve_path(space, heap, incons, t, lookup, weight, incumbent, deadline)
+        # An interrupted pass may still have improved the goal; its path is valid, only
+        # its w-bound is unproven.
+        if g[t] < best_cost:
+            best_path = space.path(t)
+            best_cost = g[t]
+            if incumbent is not None:
+                incumbent.offer(best_cost, best_path)
+        if deadline is not None and deadline.passed:
+            # Out of budget: keep the bound proven so far rather than scan the frontier.
+            break
+        frontier = {v for _, v in heap if status[v] == OPEN}
+        frontier.update(incons)
+        # ARA*'s bound: no path is cheaper than the least g + h over OPEN and INCONS,
+        # except through states pruned against the incumbent.
+        cap = best_cost if incumbent is None else min(best_cost, incumbent.cost)
+        lower = max(lower, min([g[v] + lookup(v) for v in frontier] + [cap]))
+        if incumbent is not None:
+            incumbent.raise_lower(lower)
+        weight = max(1, weight - epsilon)
+        heap = [(g[v] + weight * lookup(v), v) for v in frontier]
+        heapq.heapify(heap)
+        incons.clear()
+        space.reopen()
+
+    space.record()
+    return Util.AnytimeResult(best_path, space.states(OPEN), space.states(CLOSED), best_cost, lower)
+
+def smha_star(grid, start, goal, heuristics, weights, incumbent=None, deadline=None):
+    if not grid.path_exists(start, goal):
+        return None, {start.state}, set(), None
+    w1, w2 = weights
+    space = SearchSpace(grid)
+    s, t = grid.state_id(start.state), grid.state_id(goal)
+    g, parent, costs = space.g, space.parent, space.costs
+    successors = space.successors
+    heappush, heappop = heapq.heappush, heapq.heappop
+    lookups = [space.heuristic(h, goal) for h in heuristics]
+    closed_anchor = space.flags()
+    closed_inad = space.flags()
+    n = len(heuristics)
+
+    g[s] = float(start.g_score)
+    open = [[(g[s] + w1 * lookups[i](s), s)] for i in range(n)]
+    # Heap entries per state in each queue; a queue's open list is the states with any.
+    held = [{s: 1} for _ in range(n)]
+    space.peak_open = max(space.peak_open, 1)
+
+    def push(i, key, v):
+        heappush(open[i], (key, v))
+        held[i][v] = held[i].get(v, 0) + 1
+
+    def pop(i):
+        u = heappop(open[i])[1]
+        if held[i][u] == 1:
+            del held[i][u]
+        else:
+            held[i][u] -= 1
+        return u
+
+    def top(i, closed):
+        queue = open[i]
+        h = lookups[i]
+        while queue:
+            f, u = queue[0]
+            if not closed[u] and f == g[u] + w1 * h(u):
+                return f
+            pop(i)
+        return math.inf
+
+    def expand(u):
+        bound = math.inf if incumbent is None else incumbent.cost
+        gu = g[u] + costs[u]
+        succ = successors(u)
+        space.expanded += 1
+        space.generated += len(succ)
+        for v in succ:
+            if gu < g[v] and gu + lookups[0](v) < bound:
+                g[v] = gu
+                parent[v] = u
+                if not closed_anchor[v]:
+                    key = gu + w1 * lookups[0](v)
+                    push(0, key, v)
+                    if not closed_inad[v]:
+                        for i in range(1, n):
+                            key_i = gu + w1 * lookups[i](v)
+                            if key_i <= w2 * key:
+                                push(i, key_i, v)
+        space.peak_open = max(space.peak_open, max(map(len, held)))
+
+    def result(i, closed, found):
+        space.record()
+        open_set = id_states(grid, list(held[i]))
+        closed_set = space.marked(closed, 1)
+        if found:
+            return space.path(t), open_set, closed_set, g[t]
+        return None, open_set, closed_set, None
+
+    while top(0, closed_anchor) < math.inf:
+        if deadline is not None and deadline.expired():
+            break
+        for i in range(1, max(n, 2)):
+            anchor_key = top(0, closed_anchor)
+            if anchor_key == math.inf:
+                break
+            key_i = top(i, closed_inad) if i < n else math.inf
+            if key_i <= w2 * anchor_key:
+                if g[t] <= key_i:
+                    return result(i, closed_inad, True)
+                u = pop(i)
+                closed_inad[u] = 1
+                expand(u)
+            else:
+                if g[t] <= anchor_key:
+                    return result(0, closed_anchor, True)
+                u = pop(0)
+                closed_anchor[u] = 1
+                expand(u)
+
+    return result(0, closed_anchor, False)
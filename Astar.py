@@ -1,15 +1,28 @@
 import Util
 import math
 import heuristics as heu
+import ArraySearch
+import HPA
 
-def A_star(grid, start, goal, h, weight):
-    open_list = Util.PQ()
+def A_star(grid, start, goal, h, weight, backend="node", incumbent=None, deadline=None):
+    if backend == "array":
+        return ArraySearch.A_star(grid, start, goal, h, weight, incumbent, deadline)
+    if backend == "hpa":
+        return HPA.A_star(grid, start, goal, h, weight, incumbent, deadline)
+    if not grid.path_exists(start, goal):
+        return None, {start.state}, set(), None
+    if hasattr(h, "table"):
+        # Heuristics that keep their own tables see one request per search this way.
+        h = heu.Lookup(h, grid.grid.shape)
+    open_list = Util.IndexedPQ()
     open_list.push((start), 0)
     open_set = {start.state}
     closed_set = set()
     final_cost = None
 
     while not open_list.isEmpty():
+        if deadline is not None and deadline.expired():
+            break
         current_node = open_list.pop()
         open_set.remove(current_node.state)
         closed_set.add(current_node.state)
@@ -29,6 +42,8 @@ def A_star(grid, start, goal, h, weight):
 
             if neighbor.state not in closed_set:
                 h_score = h(neighbor.state, goal)
+                if incumbent is not None and g_score + h_score >= incumbent.cost:
+                    continue
                 f_score = g_score + weight*h_score
                 open_list.update((neighbor), f_score)
                 open_set.add(neighbor.state)
@@ -0,0 +1,125 @@
+import os
+import sys
+import time
+import argparse
+import multiprocessing as mp
+from multiprocessing import shared_memory
+import numpy as np
+import Util
+import Benchmark
+
+# Batch queries against one grid. The grid's arrays (costs, mask, successor tables and
+# component labels) are copied into shared memory once; pool workers attach to them
+# by name and answer (start, goal) queries without rebuilding any per-grid state.
+
+SHARED_FIELDS = ("grid", "mask", "adj_counts", "adj_neighbors", "adj_costs", "labels")
+
+class SharedGrid:
+    """Shared-memory copy of a Gridworld. specs holds what a worker needs to attach."""
+    def __init__(self, grid):
+        if grid.tables:
+            if grid.adj_counts is None:
+                grid.build_adjacency()
+            grid.components()
+        self.connectivity = grid.connectivity
+        self.tables = grid.tables
+        self.blocks = []
+        self.specs = {}
+        for field in SHARED_FIELDS:
+            array = getattr(grid, field)
+            if array is None:
+                continue
+            block = shared_memory.SharedMemory(create=True, size=max(1, array.nbytes))
+            np.ndarray(array.shape, array.dtype, block.buf)[...] = array
+            self.blocks.append(block)
+            self.specs[field] = (block.name, array.shape, array.dtype.str)
+
+    def close(self):
+        for block in self.blocks:
+            block.close()
+            block.unlink()
+        self.blocks = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def attach(specs, connectivity, tables=True):
+    """Gridworld over the shared arrays described by specs, and the blocks backing it,
+    which must stay open for as long as the grid is used."""
+    blocks = []
+    arrays = {}
+    for field, (name, shape, dtype) in specs.items():
+        block = shared_memory.SharedMemory(name=name)
+        blocks.append(block)
+        arrays[field] = np.ndarray(shape, dtype, block.buf)
+    grid = Util.Gridworld.from_array(arrays.pop("grid"), connectivity, tables)
+    for field, array in arrays.items():
+        setattr(grid, field, array)
+    if grid.adj_counts is not None:
+        grid.adj_offsets = np.arange(grid.width * grid.height + 1, dtype=np.int64) * grid.adj_degree
+    return grid, blocks
+
+_worker = {}
+
+def _init_worker(specs, connectivity, tables, algorithm, paths):
+    grid, blocks = attach(specs, connectivity, tables)
+    fn = Benchmark.ALGORITHMS[algorithm] if isinstance(algorithm, str) else algorithm
+    _worker.update(grid=grid, blocks=blocks, fn=fn, paths=paths)
+
+def _run_query(query):
+    i, start, goal = query
+    Util.stats.reset()
+    began = time.perf_counter()
+    path, cost = _worker["fn"](_worker["grid"], start, goal)
+    record = {"index": i, "start": start, "goal": goal, "seconds": time.perf_counter() - began,
+              "cost": None if path is None else float(cost), "worker": os.getpid()}
+    record.update(Util.stats.as_dict())
+    if _worker["paths"]:
+        record["path"] = None if path is None else np.asarray(path, dtype=np.int32).reshape(-1, 2)
+    return record
+
+def batch_query(grid, queries, algorithm="astar-array", processes=None, chunksize=8, paths=True):
+    """Answer queries, an (N, 4) array of (start_x, start_y, goal_x, goal_y) rows, on a
+    pool of processes attached to grid through shared memory. algorithm is a
+    Benchmark.ALGORITHMS name or a picklable fn(grid, start, goal) -> (path, cost).
+    Yields one record per query in completion order; record["index"] is its row."""
+    queries = np.asarray(queries, dtype=np.int64).reshape(-1, 4)
+    tasks = ((i, (sx, sy), (gx, gy)) for i, (sx, sy, gx, gy) in enumerate(queries.tolist()))
+    with SharedGrid(grid) as shared:
+        with mp.Pool(processes, _init_worker, (shared.specs, shared.connectivity, shared.tables, algorithm, paths)) as pool:
+            yield from pool.imap_unordered(_run_query, tasks, chunksize)
+
+def random_queries(grid, n, seed=0):
+    free = np.argwhere(grid.free_grid())
+    rng = np.random.default_rng(seed)
+    return np.hstack([free[rng.integers(len(free), size=n)], free[rng.integers(len(free), size=n)]])
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Answer random queries on one grid with a process pool.")
+    parser.add_argument("--size", type=int, default=200)
+    parser.add_argument("--density", type=float, default=0.2)
+    parser.add_argument("--connectivity", type=int, default=8, choices=[4, 8])
+    parser.add_argument("--queries", type=int, default=1000)
+    parser.add_argument("--processes", type=int, default=os.cpu_count())
+    parser.add_argument("--algorithm", default="astar-array", choices=list(Benchmark.ALGORITHMS))
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    np.random.seed(args.seed)
+    grid = Util.Gridworld(args.size, args.size, args.density, 10, args.connectivity)
+    queries = random_queries(grid, args.queries, args.seed)
+    began = time.perf_counter()
+    solved = expanded = 0
+    for record in batch_query(grid, queries, args.algorithm, args.processes, paths=False):
+        solved += record["cost"] is not None
+        expanded += record["expanded"]
+    seconds = time.perf_counter() - began
+    print(f"{solved}/{len(queries)} solved, {expanded} expansions, {seconds:.3f}s "
+          f"({len(queries) / seconds:.1f} queries/s on {args.processes} processes)")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,252 @@
+import sys
+import json
+import math
+import time
+import platform
+import argparse
+import tracemalloc
+import numpy as np
+import Util
+import heuristics as heu
+import Astar
+import ARAstar
+import ATAstar
+import APTS
+import AMHAstar
+import MultiHeuristic as MH
+import Compose
+import Frontier
+import Priority as P
+import DC
+import potential as pt
+import Landmarks
+
+# Benchmark harness over seeded random grids. Each (instance, algorithm) pair is run
+# once for time and search counters and, unless disabled, once more under tracemalloc
+# for peak memory, since tracing slows the search down several times over.
+
+# All metrics are lower-is-better, so a ratio above 1 + tolerance is a regression.
+METRICS = ("seconds", "expanded", "generated", "peak_open", "peak_bytes", "cost")
+
+def make_instance(size, density, connectivity, seed, max_cost=10):
+    """Seeded grid with start (0, 0) and goal (size-1, size-1) both traversable and
+    connected. Obstacle layouts that disconnect them are redrawn from the same stream."""
+    np.random.seed(seed)
+    while True:
+        grid = Util.Gridworld(size, size, density, max_cost, connectivity)
+        start, goal = (0, 0), (size - 1, size - 1)
+        grid.set_cells([start, goal], np.random.randint(1, max_cost + 1, 2))
+        if grid.path_exists(start_node(start, goal), goal):
+            return grid, start, goal
+
+def start_node(start, goal):
+    return Util.Node(start, None, 0, Util.Node(goal, None, math.inf, None))
+
+def instance_heuristics(grid):
+    if grid.connectivity == 8:
+        return heu.heuristic_chebyshev, [heu.heuristic_chebyshev, heu.heuristic_octile, heu.heuristic_euclidean]
+    return heu.heuristic_manhattan, [heu.heuristic_manhattan, heu.heuristic_euclidean, heu.heuristic_chebyshev]
+
+def run_astar(grid, start, goal, backend="node"):
+    h, _ = instance_heuristics(grid)
+    path, _, _, cost = Astar.A_star(grid, start_node(start, goal), goal, h, 1, backend)
+    return path, cost
+
+def run_astar_alt(grid, start, goal):
+    path, _, _, cost = Astar.A_star(grid, start_node(start, goal), goal, Landmarks.landmarks(grid), 1, "array")
+    return path, cost
+
+def run_arastar(grid, start, goal, backend="node"):
+    h, _ = instance_heuristics(grid)
+    path, _, _, cost = ARAstar.ARA_star(grid, start_node(start, goal), goal, h, 5, 1, 5, backend)
+    return path, cost
+
+def run_atastar(grid, start, goal):
+    h, _ = instance_heuristics(grid)
+    path, _, _, cost = ATAstar.anytime_A_star(grid, start_node(start, goal), goal, h, 5, 1, 5)
+    return path, cost
+
+def run_apts(grid, start, goal):
+    h, _ = instance_heuristics(grid)
+    budget = int(grid.grid.sum())
+    path, _, _, cost = APTS.anytime_potential_search(grid, start_node(start, goal), goal, budget, pt.linear, h, 1, 5)
+    return path, cost
+
+def run_amhastar(grid, start, goal):
+    _, hs = instance_heuristics(grid)
+    path, _, _, cost = AMHAstar.anytime(grid, start_node(start, goal), goal, hs, (5, 5),
+                                        AMHAstar.update_weight, AMHAstar.valid_weight, 5)
+    return path, cost
+
+def run_smhastar(grid, start, goal, backend="node"):
+    _, hs = instance_heuristics(grid)
+    path, _, _, cost = MH.smha_star(grid, start_node(start, goal), goal, hs, (3, 3), backend)
+    return path, cost
+
+def run_imhastar(grid, start, goal):
+    _, hs = instance_heuristics(grid)
+    path, _, _, cost = MH.imha_star(grid, start_node(start, goal), goal, hs, (3, 3))
+    return path, cost
+
+def run_compose_ara(grid, start, goal):
+    h, _ = instance_heuristics(grid)
+    p = P.PriorityPotential(h, grid)
+    p.configure(5, 5, int(grid.grid.sum()), 1, 5)
+    paths, costs = Compose.ARA(grid, start_node(start, goal), goal, [p])
+    if not paths:
+        return None, None
+    return paths[-1], costs[-1]
+
+def run_frontier_ara(grid, start, goal):
+    h, _ = instance_heuristics(grid)
+    p = P.Priority(h, 5, 1, 5, grid)
+    frontier = Frontier.GenericFrontier(Frontier.make_queue(p, grid), DC.DominanceCheck(DC.g_score_DC), p, grid)
+    paths, costs = Frontier.ARA(start_node(start, goal), lambda node: node.state == goal, frontier)
+    if not paths:
+        return None, None
+    best = costs.index(min(costs))
+    return paths[best], costs[best]
+
+def run_bidirectional(grid, start, goal):
+    h, _ = instance_heuristics(grid)
+    source = start_node(start, goal)
+    target = Util.Node(goal, None, 0, Util.Node(start, None, math.inf, None))
+    forward, backward = P.PriorityBalanced(h, start, grid), P.PriorityBalanced(h, goal, grid)
+    return Frontier.bidirectional(
+        source, target,
+        Frontier.GenericFrontier(Frontier.make_queue(forward, grid), DC.DominanceCheck(DC.g_score_DC), forward, grid),
+        Frontier.GenericFrontier(Frontier.make_queue(backward, grid), DC.DominanceCheck(DC.g_score_DC), backward, grid,
+                                 Frontier.ReverseSuccessors(grid, start)))
+
+ALGORITHMS = {
+    "astar": run_astar,
+    "astar-array": lambda grid, start, goal: run_astar(grid, start, goal, "array"),
+    "arastar": run_arastar,
+    "arastar-array": lambda grid, start, goal: run_arastar(grid, start, goal, "array"),
+    "astar-hpa": lambda grid, start, goal: run_astar(grid, start, goal, "hpa"),
+    "astar-alt": run_astar_alt,
+    "atastar": run_atastar,
+    "apts": run_apts,
+    "amhastar": run_amhastar,
+    "smhastar": run_smhastar,
+    "smhastar-array": lambda grid, start, goal: run_smhastar(grid, start, goal, "array"),
+    "smhastar-parallel": lambda grid, start, goal: run_smhastar(grid, start, goal, "parallel"),
+    "imhastar": run_imhastar,
+    "compose-ara": run_compose_ara,
+    "frontier-ara": run_frontier_ara,
+    "bidirectional": run_bidirectional,
+}
+
+def measure(fn, size, density, connectivity, seed, memory=True, repeat=1):
+    """Best wall time over repeat fresh runs; counters come from the last run, the
+    searches being deterministic for a given instance."""
+    seconds = math.inf
+    for _ in range(repeat):
+        grid, start, goal = make_instance(size, density, connectivity, seed)
+        Util.stats.reset()
+        began = time.perf_counter()
+        path, cost = fn(grid, start, goal)
+        seconds = min(seconds, time.perf_counter() - began)
+    result = {"seconds": seconds}
+    result.update(Util.stats.as_dict())
+    result["cost"] = None if cost is None or cost == math.inf else float(cost)
+    result["path_length"] = None if path is None else len(path)
+    if memory:
+        grid, start, goal = make_instance(size, density, connectivity, seed)
+        tracemalloc.start()
+        try:
+            fn(grid, start, goal)
+            result["peak_bytes"] = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+    return result
+
+def run(algorithms, sizes, densities, connectivities, seeds, memory=True, repeat=1, verbose=True):
+    records = []
+    for size in sizes:
+        for density in densities:
+            for connectivity in connectivities:
+                for seed in seeds:
+                    for name in algorithms:
+                        record = {"algorithm": name, "size": size, "density": density,
+                                  "connectivity": connectivity, "seed": seed}
+                        try:
+                            record.update(measure(ALGORITHMS[name], size, density, connectivity, seed, memory, repeat))
+                            record["status"] = "ok"
+                        except Exception as e:
+                            record["status"] = "error"
+                            record["error"] = f"{type(e).__name__}: {e}"
+                        records.append(record)
+                        if verbose:
+                            print(format_record(record), file=sys.stderr)
+    return records
+
+def record_key(record):
+    return (record["algorithm"], record["size"], record["density"], record["connectivity"], record["seed"])
+
+def format_record(record):
+    head = f"{record['algorithm']:>15} n={record['size']} d={record['density']} c={record['connectivity']} seed={record['seed']}"
+    if record["status"] != "ok":
+        return f"{head} {record['status']}: {record.get('error')}"
+    return (f"{head} {record['seconds']:.3f}s exp={record['expanded']} gen={record['generated']} "
+            f"open={record['peak_open']} mem={record.get('peak_bytes')} cost={record['cost']}")
+
+def compare(records, baseline, tolerance=0.1):
+    """Match records to the baseline by instance and algorithm and report every metric
+    whose ratio current/baseline exceeds 1 + tolerance. Returns (rows, regressions)."""
+    previous = {record_key(r): r for r in baseline}
+    rows = []
+    regressions = []
+    for record in records:
+        old = previous.get(record_key(record))
+        if old is None or old["status"] != "ok" or record["status"] != "ok":
+            continue
+        for metric in METRICS:
+            a, b = record.get(metric), old.get(metric)
+            if a is None or b is None:
+                continue
+            ratio = a / b if b else (1.0 if a == b else math.inf)
+            row = (record_key(record), metric, b, a, ratio)
+            rows.append(row)
+            if ratio > 1 + tolerance:
+                regressions.append(row)
+    return rows, regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the search algorithms on seeded random grids.")
+    parser.add_argument("--algorithms", nargs="+", default=list(ALGORITHMS), choices=list(ALGORITHMS))
+    parser.add_argument("--sizes", nargs="+", type=int, default=[20, 50])
+    parser.add_argument("--densities", nargs="+", type=float, default=[0.2, 0.3])
+    parser.add_argument("--connectivity", nargs="+", type=int, default=[4, 8], choices=[4, 8])
+    parser.add_argument("--seeds", nargs="+", type=int, default=[0, 1, 2])
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per instance, best one kept")
+    parser.add_argument("--no-memory", action="store_true", help="skip the tracemalloc pass")
+    parser.add_argument("--output", help="write results as JSON to this file")
+    parser.add_argument("--baseline", help="JSON results of an earlier run to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.1,
+                        help="relative increase over the baseline reported as a regression")
+    args = parser.parse_args(argv)
+
+    records = run(args.algorithms, args.sizes, args.densities, args.connectivity, args.seeds,
+                  not args.no_memory, args.repeat)
+    report = {
+        "meta": {"python": platform.python_version(), "numpy": np.__version__,
+                 "platform": platform.platform(), "time": time.strftime("%Y-%m-%dT%H:%M:%S")},
+        "records": records,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=1)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)["records"]
+        rows, regressions = compare(records, baseline, args.tolerance)
+        for key, metric, old, new, ratio in regressions:
+            print(f"REGRESSION {' '.join(map(str, key))} {metric}: {old} -> {new} ({ratio:.2f}x)")
+        print(f"{len(rows)} metrics compared, {len(regressions)} regressions")
+        return 1 if regressions else 0
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
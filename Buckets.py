@@ -0,0 +1,122 @@
+import Util
+import heuristics as heu
+
+# Integer-keyed priority queues with the Frontier.PriorityQueue interface. Gridworld costs
+# are small integers, so with an integral priority function the keys are too.
+
+def integral_key(priority):
+    key = int(priority)
+    if key != priority:
+        raise ValueError(f"integer priority queue given non-integral priority {priority}")
+    return key
+
+class BucketQueue():
+    """Dial's bucket queue: one LIFO bucket per key and a cursor at the smallest
+    non-empty bucket. Keys may be pushed below the cursor, so weighted and
+    inconsistent priorities are fine."""
+    def __init__(self):
+        self.buckets = []
+        self.cursor = 0
+        self.size = 0
+
+    def push(self, priority, node):
+        key = integral_key(priority)
+        if key >= len(self.buckets):
+            self.buckets.extend([] for _ in range(key + 1 - len(self.buckets)))
+        self.buckets[key].append(node)
+        self.size += 1
+        Util.stats.open_size(self.size)
+        if key < self.cursor:
+            self.cursor = key
+
+    def advance(self):
+        if self.size == 0:
+            raise IndexError("pop from an empty priority queue")
+        while not self.buckets[self.cursor]:
+            self.cursor += 1
+
+    def pop(self):
+        self.advance()
+        self.size -= 1
+        return self.buckets[self.cursor].pop()
+
+    def peek(self):
+        self.advance()
+        return self.buckets[self.cursor][-1]
+
+    def is_empty(self):
+        return self.size == 0
+
+    def clear(self):
+        self.buckets = []
+        self.cursor = 0
+        self.size = 0
+
+    def rebuild(self, priorities, nodes):
+        self.clear()
+        for priority, node in zip(priorities, nodes):
+            self.push(priority, node)
+
+class RadixHeap():
+    """Monotone radix heap: entries sit in bucket (key ^ last).bit_length(), where
+    last is the most recently extracted minimum. Keys pushed must not be below
+    last, which holds for A* with a consistent heuristic and w1 = 1."""
+    def __init__(self):
+        self.buckets = [[] for _ in range(65)]
+        self.last = 0
+        self.size = 0
+
+    def push(self, priority, node):
+        key = integral_key(priority)
+        if key < self.last:
+            raise ValueError(f"radix heap key {key} is below the last extracted key {self.last}")
+        self.buckets[(key ^ self.last).bit_length()].append((key, node))
+        self.size += 1
+        Util.stats.open_size(self.size)
+
+    def pull(self):
+        if self.size == 0:
+            raise IndexError("pop from an empty priority queue")
+        if self.buckets[0]:
+            return
+        i = 1
+        while not self.buckets[i]:
+            i += 1
+        entries = self.buckets[i]
+        self.buckets[i] = []
+        self.last = min(key for key, _ in entries)
+        for key, node in entries:
+            self.buckets[(key ^ self.last).bit_length()].append((key, node))
+
+    def pop(self):
+        self.pull()
+        self.size -= 1
+        return self.buckets[0].pop()[1]
+
+    def peek(self):
+        self.pull()
+        return self.buckets[0][-1][1]
+
+    def is_empty(self):
+        return self.size == 0
+
+    def clear(self):
+        self.buckets = [[] for _ in range(65)]
+        self.last = 0
+        self.size = 0
+
+    def rebuild(self, priorities, nodes):
+        self.clear()
+        for priority, node in zip(priorities, nodes):
+            self.push(priority, node)
+
+def select_queue(priority, grid, default):
+    """Pick a queue for priority: a radix heap when keys are integral and monotone
+    (w1 = 1 for the whole schedule and a consistent heuristic), a bucket queue when
+    they are only integral, and default() otherwise."""
+    integral = getattr(priority, "integral", None)
+    if integral is None or not integral():
+        return default()
+    if priority.w1 == 1 and heu.is_consistent(priority.heuristic, grid.connectivity):
+        return RadixHeap()
+    return BucketQueue()
@@ -1,18 +1,22 @@
 import math
+import time
 import Util
 import heuristics as heu
 import Priority as P
 
-def improve_path(grid, goal, priority, open_set, g_scores):
+def improve_path(grid, goal, priority, open_set, g_scores, deadline=None):
     open_set = open_set[0]
-    open = Util.PQ()
+    open = Util.IndexedPQ()
     closed = set()
     incons = set()
     for node in open_set:
         open.push((node), priority(node))
         g_scores[node.state] = node.g_score
+    goal_node = min((node for node in open_set if node.state == goal), key=lambda node: node.g_score, default=None)
     
     while not open.isEmpty() and g_scores[goal] > open.peek()[0]:
+        if deadline is not None and deadline.expired():
+            break
         current = open.pop()
         open_set.remove(current)
         closed.add(current.state)
@@ -22,20 +26,26 @@ def improve_path(grid, goal, priority, open_set, g_scores):
             
             if g_score < g_scores.get(neighbor.state, math.inf):
                 g_scores[neighbor.state] = g_score
+                if neighbor.state == goal:
+                    goal_node = neighbor
                 if neighbor.state not in closed:
                     open.push((neighbor), priority(neighbor))
                     open_set.add(neighbor)
                 else:
                     incons.add(neighbor)
     
+    # Potential priorities do not key the goal at its g, so the queue can run dry
+    # with the goal reached; fall back to the cheapest goal node generated.
     res = None
-    if g_scores[goal] == open.peek()[0]:
+    if not open.isEmpty() and g_scores[goal] == open.peek()[0]:
         res = open.peek()[-1]
+    elif goal_node is not None and goal_node.g_score == g_scores[goal]:
+        res = goal_node
 
     return [open_set], closed, [incons], res, g_scores
 
-def improve_path_multi(grid, goal, priority, open_set, gs):
-    open = [Util.PQWithUpdate() for _ in range(len(priorities))]
+def improve_path_multi(grid, goal, priority, open_set, gs, deadline=None):
+    open = [Util.IndexedPQ() for _ in range(len(priorities))]
     open_anchor: set[Util.Node] = open_set[0]
     open_inad = open_set[1]
     closed_anchor = set()
@@ -54,6 +64,8 @@ def improve_path_multi(grid, goal, priority, open_set, gs):
         gs[0][node.state] = node.g_score
     
     while not open[0].isEmpty():
+        if deadline is not None and deadline.expired():
+            break
         for i in range(1, len(priorities)):
             if not open[i].isEmpty() and open[i].peek()[0] <= priorities[0].w2 * open[0].peek()[0]:
                 g_scores = gs[1]
@@ -88,12 +100,20 @@ def improve_path_multi(grid, goal, priority, open_set, gs):
     return open_anchor, closed_anchor, incons_anchor, None
 
 
-def ARA(grid, start, goal, heuristics):
-    best_path = None
-    best_cost = math.inf
+def ARA(grid, start, goal, heuristics, deadline=None):
     paths = []
     costs = []
-    
+    for path, cost, _, _ in ARA_stream(grid, start, goal, heuristics, deadline):
+        paths.append(path)
+        costs.append(cost)
+    return paths, costs
+
+def ARA_stream(grid, start, goal, heuristics, deadline=None):
+    """Generator form of ARA: yields (path, cost, bound, elapsed) for each improved path
+    as soon as it is found. bound is cost over the least g + h left in the anchor's OPEN
+    and INCONS; elapsed is seconds since the search began."""
+    began = time.perf_counter()
+
     if len(heuristics) > 1:
         improve = improve_path_multi
         h = heuristics
@@ -109,26 +129,21 @@ def ARA(grid, start, goal, heuristics):
         g_scores[goal] = math.inf
         open = [set([start])]
 
+    if deadline is None:
+        deadline = getattr(heuristics[0], "deadline", None)
     while heuristics[0].valid():
-        open_set, closed_set, incons_set, node, g = improve(grid, goal, h, open, g_scores)
+        open_set, closed_set, incons_set, node, g = improve(grid, goal, h, open, g_scores, deadline)
+        if node is None:
+            # Cut off by the deadline or out of states: no next pass to merge INCONS for.
+            break
 
         for i in range(len(open_set)):
             open[i] = open_set[i] | incons_set[i]
-        if node != None:
-            path_cost = g[goal]
-            path = reconstruct_path(node, start)
-            if g[goal] < best_cost:
-                best_path = path
-                best_cost = path_cost
-            paths.append(path)
-            costs.append(path_cost)
-            for p in heuristics:
-                p.update(path_cost)
-        else:
-            break 
-    
-
-    return paths, costs
+        path_cost = g[goal]
+        lower = min([path_cost] + [n.g_score + heuristics[0].lookup(n.state, goal) for n in open[0]])
+        yield reconstruct_path(node, start), path_cost, Util.suboptimality(path_cost, lower), time.perf_counter() - began
+        for p in heuristics:
+            p.update(path_cost)
 
 def reconstruct_path(current, start):
     path = []
@@ -153,10 +168,10 @@ if __name__ == "__main__":
     anytimePotentials = []
 
     for h in heuristics:
-        p = P.Priority(h)
-        p2 = P.Priority(h)
-        p3 = P.PriorityPotential(h)
-        p4 = P.PriorityPotential(h)
+        p = P.Priority(h, grid=grid)
+        p2 = P.Priority(h, grid=grid)
+        p3 = P.PriorityPotential(h, grid)
+        p4 = P.PriorityPotential(h, grid)
         p.configure(3, 3, 0, 1)
         p2.configure(50, 12, 5, 10)
         p3.configure(3,3, 200, 0, 1)
@@ -37,6 +37,11 @@ class DominanceCheck():
         self.incons = set()
         self.closed = set()
 
+    def reopen(self, open):
+        """Clear, then start the next pass with the set open as OPEN."""
+        self.clear()
+        self.open = open
+
     def get_incons(self):
         return self.incons
     
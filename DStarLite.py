@@ -0,0 +1,300 @@
+import sys
+import math
+import time
+import heapq
+import argparse
+from array import array
+import numpy as np
+import Util
+import heuristics as heu
+import ArraySearch
+import Benchmark
+
+# D* Lite (Koenig and Likhachev, 2002) on a Gridworld. The search runs backward from the
+# goal, so g and rhs hold costs to the goal and stay valid when the start moves. After a
+# batch of cell edits only the vertices whose successor costs changed are repaired, so
+# replanning work follows the size of the change rather than the size of the map.
+# Moving from u costs grid[u] and needs the next cell traversable, as everywhere else:
+# rhs(u) = cost(u) + min g over u's successors, and the predecessors of a traversable
+# cell are its traversable neighbors.
+# The repair assumes h stays put while the grid changes. Heuristics computed from the
+# grid (those with a version, such as Landmarks) do not, so edits restart the search.
+
+class DStarLite:
+    def __init__(self, grid, start, goal, h):
+        if grid.adj_counts is None:
+            grid.build_adjacency()
+        self.grid = grid
+        self.h_fn = h
+        self.goal = grid.state_id(goal)
+        self.degree = grid.adj_degree
+        self.expanded = 0
+        self.generated = 0
+        self.peak_open = 0
+        self.refresh()
+        self.reset(start)
+
+    def reset(self, start):
+        """Forget every g and rhs value and queue the goal again, as a new search would."""
+        size = self.grid.width * self.grid.height
+        self.g = array('d', [math.inf]) * size
+        self.rhs = array('d', [math.inf]) * size
+        self.key1 = array('d', [math.inf]) * size
+        self.key2 = array('d', [math.inf]) * size
+        self.queued = bytearray(size)
+        self.live = 0
+        self.heap = []
+        self.km = 0.0
+        self.set_start(start)
+        self.rhs[self.goal] = 0
+        self.settle(self.goal)
+
+    def refresh(self):
+        grid = self.grid
+        self.costs = memoryview(np.ascontiguousarray(grid.grid).reshape(-1))
+        self.counts = memoryview(grid.adj_counts)
+        self.neighbors = memoryview(grid.adj_neighbors)
+
+    def set_start(self, start):
+        self.start = self.grid.state_id(start)
+        self.h = self.start_lookup(start)
+        self.track_start()
+
+    def start_lookup(self, start):
+        # Keys need h(start, v), the estimate from the start to v. The geometric
+        # heuristics are symmetric and read it from their table; others (ALT bounds are
+        # not symmetric when costs are paid on leaving a cell) are asked the right way.
+        if self.h_fn in heu.BATCH:
+            return ArraySearch.heuristic_lookup(self.grid, self.h_fn, start)
+        h, width = self.h_fn, self.grid.width
+        cache = array('d', [-1.0]) * (width * self.grid.height)
+
+        def lookup(v):
+            hv = cache[v]
+            if hv < 0:
+                hv = cache[v] = h(start, divmod(v, width))
+            return hv
+        return lookup
+
+    def track_start(self):
+        # A start on an obstacle can still be left (at no cost), but no row lists it as
+        # a predecessor, so its successors are tracked here instead.
+        u = self.start
+        row = u * self.degree
+        self.start_successors = set() if self.costs[u] else set(self.neighbors[row:row + self.counts[u]])
+
+    def move_start(self, start):
+        """Move the start to another cell, as a robot following the plan would."""
+        last = self.grid.id_state(self.start)
+        self.set_start(start)
+        self.km += self.h_fn(last, start)
+
+    def key(self, u):
+        m = min(self.g[u], self.rhs[u])
+        return m + self.h(u) + self.km, m
+
+    def settle(self, u):
+        if self.g[u] != self.rhs[u]:
+            k1, k2 = self.key(u)
+            self.key1[u], self.key2[u] = k1, k2
+            self.live += not self.queued[u]
+            self.queued[u] = 1
+            heapq.heappush(self.heap, (k1, k2, u))
+        else:
+            self.live -= self.queued[u]
+            self.queued[u] = 0
+
+    def successor_min(self, u):
+        g, neighbors = self.g, self.neighbors
+        row = u * self.degree
+        best = math.inf
+        for v in neighbors[row:row + self.counts[u]]:
+            if g[v] < best:
+                best = g[v]
+        return best
+
+    def update_vertex(self, u):
+        if u != self.goal:
+            self.rhs[u] = self.costs[u] + self.successor_min(u)
+        self.settle(u)
+
+    def update_cells(self, cells, costs):
+        """Apply a batch of cost changes (0 for an obstacle) to the grid and queue the
+        vertices they make inconsistent. The repair itself happens in plan."""
+        cells = np.asarray(cells, dtype=np.int64).reshape(-1, 2)
+        was_free = self.grid.free_cells(cells[:, 0], cells[:, 1])
+        self.grid.set_cells(cells, costs)
+        self.refresh()
+        if hasattr(self.h_fn, "version"):
+            # Queued keys were computed from the old h values; start over from the goal.
+            self.reset(self.grid.id_state(self.start))
+            return
+        now_free = self.grid.free_cells(cells[:, 0], cells[:, 1])
+        ids = (cells[:, 0] * self.grid.width + cells[:, 1]).tolist()
+        for u, flipped in zip(ids, (was_free != now_free).tolist()):
+            self.update_vertex(u)
+            if flipped:
+                row = u * self.degree
+                for p in self.neighbors[row:row + self.counts[u]]:
+                    self.update_vertex(p)
+        self.track_start()
+        if self.start_successors:
+            self.update_vertex(self.start)
+
+    def compute(self):
+        g, rhs, key1, key2, queued, costs = self.g, self.rhs, self.key1, self.key2, self.queued, self.costs
+        degree, counts, neighbors = self.degree, self.counts, self.neighbors
+        heap, h, km = self.heap, self.h, self.km
+        heappush, heappop = heapq.heappush, heapq.heappop
+        start, goal, start_successors = self.start, self.goal, self.start_successors
+        inf = math.inf
+        expanded = generated = 0
+        peak_open = self.peak_open
+        # Vertices on the queue, as opposed to heap entries, which include stale ones.
+        live = self.live
+
+        def settle(p):
+            nonlocal live
+            gp, rp = g[p], rhs[p]
+            if gp != rp:
+                m = gp if gp < rp else rp
+                k1 = m + h(p) + km
+                key1[p], key2[p] = k1, m
+                live += not queued[p]
+                queued[p] = 1
+                heappush(heap, (k1, m, p))
+            else:
+                live -= queued[p]
+                queued[p] = 0
+
+        while heap:
+            k1, k2, u = heap[0]
+            if not queued[u] or k1 != key1[u] or k2 != key2[u]:
+                heappop(heap)
+                continue
+            gs, rs = g[start], rhs[start]
+            if rs == gs and (k1, k2) >= (rs + h(start) + km, rs):
+                break
+            heappop(heap)
+            gu, ru = g[u], rhs[u]
+            m = gu if gu < ru else ru
+            new = (m + h(u) + km, m)
+            if (k1, k2) < new:
+                key1[u], key2[u] = new
+                heappush(heap, (new[0], m, u))
+                continue
+            queued[u] = 0
+            live -= 1
+            expanded += 1
+            if costs[u]:
+                row = u * degree
+                preds = neighbors[row:row + counts[u]].tolist()
+            else:
+                preds = []
+            if u in start_successors:
+                preds.append(start)
+            generated += len(preds)
+            if gu > ru:
+                g[u] = ru
+                for p in preds:
+                    if p != goal and costs[p] + ru < rhs[p]:
+                        rhs[p] = costs[p] + ru
+                    settle(p)
+            else:
+                g[u] = inf
+                for p in preds:
+                    if p != goal and rhs[p] == costs[p] + gu:
+                        row = p * degree
+                        best = inf
+                        for v in neighbors[row:row + counts[p]]:
+                            if g[v] < best:
+                                best = g[v]
+                        rhs[p] = costs[p] + best
+                    settle(p)
+                settle(u)
+            if live > peak_open:
+                peak_open = live
+
+        self.expanded += expanded
+        self.generated += generated
+        self.peak_open = peak_open
+        self.live = live
+
+    def plan(self):
+        """Repair the solution and return (path, cost): the cheapest path from the start
+        as a Util.PathView and its cost, or (None, None) if the goal is unreachable."""
+        self.expanded = self.generated = self.peak_open = 0
+        self.compute()
+        Util.stats.expanded += self.expanded
+        Util.stats.generated += self.generated
+        Util.stats.open_size(self.peak_open)
+        if self.rhs[self.start] == math.inf:
+            return None, None
+        return Util.PathView(self.path()), self.rhs[self.start]
+
+    def path(self):
+        g, neighbors, counts, degree = self.g, self.neighbors, self.counts, self.degree
+        ids = array('q', [self.start])
+        u = self.start
+        for _ in range(len(g)):
+            if u == self.goal:
+                break
+            row = u * degree
+            u = min(neighbors[row:row + counts[u]], key=g.__getitem__)
+            ids.append(u)
+        else:
+            raise ValueError("g values do not lead to the goal")
+        ids = np.frombuffer(ids, dtype=np.int64)
+        path = np.empty((len(ids), 2), dtype=np.int32)
+        path[:, 0], path[:, 1] = np.divmod(ids, self.grid.width)
+        return path
+
+def random_changes(grid, n, radius, rng, max_cost=10, density=0.3, keep=()):
+    """n cells inside one randomly placed (2 * radius + 1)-wide square, each made an
+    obstacle with probability density and given a random cost otherwise. Cells in keep
+    are left alone."""
+    cx, cy = rng.integers(grid.height), rng.integers(grid.width)
+    xs = np.clip(cx + rng.integers(-radius, radius + 1, n), 0, grid.height - 1)
+    ys = np.clip(cy + rng.integers(-radius, radius + 1, n), 0, grid.width - 1)
+    cells = np.unique(np.stack([xs, ys], axis=1), axis=0)
+    cells = np.array([c for c in cells.tolist() if tuple(c) not in keep], dtype=np.int64).reshape(-1, 2)
+    costs = np.where(rng.random(len(cells)) < density, 0, rng.integers(1, max_cost + 1, len(cells)))
+    return cells, costs
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replan with D* Lite after batches of local cell changes.")
+    parser.add_argument("--size", type=int, default=300)
+    parser.add_argument("--density", type=float, default=0.2)
+    parser.add_argument("--connectivity", type=int, default=8, choices=[4, 8])
+    parser.add_argument("--batches", type=int, default=20)
+    parser.add_argument("--cells", type=int, default=20, help="cells changed per batch")
+    parser.add_argument("--radius", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--check", action="store_true", help="compare every cost with a fresh A* search")
+    args = parser.parse_args(argv)
+
+    grid, start, goal = Benchmark.make_instance(args.size, args.density, args.connectivity, args.seed)
+    h, _ = Benchmark.instance_heuristics(grid)
+    began = time.perf_counter()
+    planner = DStarLite(grid, start, goal, h)
+    path, cost = planner.plan()
+    print(f"initial plan: cost {cost}, {planner.expanded} expansions, {time.perf_counter() - began:.3f}s")
+
+    rng = np.random.default_rng(args.seed)
+    for i in range(args.batches):
+        cells, costs = random_changes(grid, args.cells, args.radius, rng, keep={start, goal})
+        began = time.perf_counter()
+        planner.update_cells(cells, costs)
+        path, cost = planner.plan()
+        seconds = time.perf_counter() - began
+        line = f"batch {i}: {len(cells)} cells, cost {cost}, {planner.expanded} expansions, {seconds:.4f}s"
+        if args.check:
+            _, _, _, fresh = ArraySearch.A_star(grid, Benchmark.start_node(start, goal), goal, h, 1)
+            line += f", A* {fresh}"
+            if (fresh is None) != (cost is None) or (fresh is not None and fresh != cost):
+                line += " MISMATCH"
+        print(line)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
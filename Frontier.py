@@ -1,9 +1,15 @@
 import math
+import time
 import heapq
+import numpy as np
 import Priority as P
 import Util
 import heuristics
 import DC
+import Buckets
+
+# Below this many nodes a per-node priority call is cheaper than a NumPy batch.
+BATCH_MIN = 32
 
 class PriorityQueue():
     def __init__(self):
@@ -11,6 +17,7 @@ class PriorityQueue():
 
     def push(self, priority, node):
         heapq.heappush(self.heap, (priority, node))
+        Util.stats.open_size(len(self.heap))
 
     def pop(self):
         return heapq.heappop(self.heap)[1]
@@ -23,27 +30,61 @@ class PriorityQueue():
     
     def clear(self):
         self.heap = []
+
+    def rebuild(self, priorities, nodes):
+        self.heap = list(zip(priorities, nodes))
+        heapq.heapify(self.heap)
+        Util.stats.open_size(len(self.heap))
+
+class IndexedPriorityQueue():
+    def __init__(self):
+        self.heap = Util.IndexedPQ()
+
+    def push(self, priority, node):
+        self.heap.update(node, priority)
+
+    def pop(self):
+        return self.heap.pop()
+
+    def peek(self):
+        return self.heap.peek()[-1]
+
+    def is_empty(self):
+        return self.heap.isEmpty()
+
+    def clear(self):
+        self.heap.clear()
+
+    def rebuild(self, priorities, nodes):
+        self.heap.rebuild(nodes, priorities)
     
 class GenericFrontier():
-    def __init__(self, queue, DC, priority, grid):
+    def __init__(self, queue, DC, priority, grid, successors=None):
         self.heap = []
         self.queue = queue
         self.DC = DC
         self.priority = priority
         self.grid = grid
+        self.successors = successors
 
     def insert(self, node):
         priority = self.priority(node)
         self.queue.push(priority, node)
         self.DC.insert(node)
 
+    def priorities(self, nodes):
+        if len(nodes) >= BATCH_MIN and hasattr(self.priority, "batch"):
+            return self.priority.batch(nodes).tolist()
+        return [self.priority(node) for node in nodes]
+
     def expand_node(self):
         node = self.queue.pop()
         self.DC.expand(node)
-        for neighbor in node.expand_node(self.grid):
-            if not self.DC.is_dominated(neighbor):
-                priority = self.priority(neighbor)
-                self.queue.push(priority, neighbor)
+        children = node.expand_node(self.grid) if self.successors is None else self.successors(node)
+        successors = [neighbor for neighbor in children if not self.DC.is_dominated(neighbor)]
+        for priority, neighbor in zip(self.priorities(successors), successors):
+            self.queue.push(priority, neighbor)
+        return successors
     
     def peek(self):
         return self.queue.peek()
@@ -55,32 +96,126 @@ class GenericFrontier():
         if not self.priority.valid():
             return False
         
-        open = self.DC.get_open()
-        incons = self.DC.get_incons()
-        new_open = list(open | incons)
-        self.queue.clear()
-        self.DC.clear()
-        
-        for node in new_open:
-            self.insert(node)
+        open = self.DC.get_open() | self.DC.get_incons()
+        new_open = list(open)
+        # Re-key OPEN and INCONS in one batch and rebuild the queue in O(n). The
+        # rebuild allocates an entry per node at once, so keep the collector out of it.
+        with Util.gc_paused():
+            self.queue.rebuild(self.priorities(new_open), new_open)
+        self.DC.reopen(open)
         
         self.priority.update()
         return True
 
-def ARA(start, goal_check, frontier):
-    frontier.insert(start)
+class ReverseSuccessors():
+    """Successors for searching from the goal back to start. A move u -> v costs grid[u]
+    and needs v traversable, so stepping back from v reaches v's neighbors, each adding
+    its own cost, and an obstacle has none. A start on an obstacle can still be left,
+    so it is added back where it is adjacent."""
+    def __init__(self, grid, start):
+        self.grid = grid
+        self.start = grid.state_id(start)
+        self.start_successors = set() if grid.is_traversable(*start) else set(grid.neighbors(self.start))
+
+    def __call__(self, node):
+        grid = self.grid
+        x, y = node.state
+        v = x * grid.width + y
+        predecessors = grid.neighbors(v) if grid.grid[x, y] else []
+        if v in self.start_successors:
+            predecessors.append(self.start)
+        intern_state = grid.intern_state
+        successors = []
+        for u in predecessors:
+            state = intern_state(u)
+            successors.append(Util.Node(state, node, node.g_score + int(grid.grid[state]), node.goal))
+        Util.stats.expanded += 1
+        Util.stats.generated += len(successors)
+        return successors
+
+def make_queue(priority, grid):
+    return Buckets.select_queue(priority, grid, IndexedPriorityQueue)
+
+def ARA(start, goal_check, frontier, deadline=None):
+    """deadline defaults to the priority's; once it passes, the paths found so far are
+    returned without finishing the current pass."""
     paths = []
     costs = []
+    for path, cost, _, _ in ARA_stream(start, goal_check, frontier, deadline):
+        paths.append(path)
+        costs.append(cost)
+    return paths, costs
+
+def ARA_stream(start, goal_check, frontier, deadline=None):
+    """Generator form of ARA: yields (path, cost, bound, elapsed) as soon as each pass
+    finds a path, where bound is cost over the least g + h left in OPEN and INCONS and
+    elapsed is seconds since the search began. Closing the generator stops the search."""
+    began = time.perf_counter()
+    if deadline is None:
+        deadline = getattr(frontier.priority, "deadline", None)
+    frontier.insert(start)
     while frontier.restart():
-        curr = None
         while not frontier.is_empty():
+            if deadline is not None and deadline.expired():
+                return
             curr = frontier.peek()
             if goal_check(curr):
-                paths.append(reconstruct_path(start, curr))
-                costs.append(curr.g_score)
+                cost = curr.g_score
+                yield (reconstruct_path(start, curr), cost, Util.suboptimality(cost, lower_bound(frontier, cost)),
+                       time.perf_counter() - began)
                 break
             frontier.expand_node()
-    return paths, costs
+
+def bidirectional(start, goal, forward, backward):
+    """Bidirectional search between start, a Node whose goal is the goal Node, and goal,
+    a Node whose goal is start. backward expands with ReverseSuccessors, and both sides
+    are keyed by P.PriorityBalanced. Each step expands the side with the smaller top key,
+    and every generated node is matched against the best g the other side holds for its
+    cell, which keeps the cheapest meeting. No path left is cheaper than the sum of the
+    two top keys, so the search stops once the meeting costs no more than that; with a
+    consistent heuristic the result is optimal. Returns (path, cost) or (None, None)."""
+    best, meeting = math.inf, None
+    for frontier, root in ((forward, start), (backward, goal)):
+        # Records the root's g so that the other side can meet it.
+        frontier.DC.is_dominated(root)
+        frontier.insert(root)
+    if start.state == goal.state:
+        best, meeting = start.g_score + goal.g_score, (start, goal)
+
+    while not forward.is_empty() and not backward.is_empty():
+        top_forward, top_backward = forward.priority(forward.peek()), backward.priority(backward.peek())
+        if best <= top_forward + top_backward:
+            break
+        if top_forward <= top_backward:
+            side, other = forward, backward
+        else:
+            side, other = backward, forward
+        nodes = other.DC.nodes
+        for node in side.expand_node():
+            twin = nodes.get(node.state)
+            if twin is not None and node.g_score + twin.g_score < best:
+                best = node.g_score + twin.g_score
+                meeting = (node, twin) if side is forward else (twin, node)
+
+    if meeting is None:
+        return None, None
+    ahead, behind = meeting
+    path = reconstruct_path(start, ahead)
+    while behind.parent is not None:
+        behind = behind.parent
+        path.append(behind.state)
+    return path, best
+
+def lower_bound(frontier, cost):
+    """Least g + h over OPEN and INCONS, capped at cost: no path is cheaper when the
+    priority's heuristic is admissible."""
+    nodes = list(frontier.DC.get_open() | frontier.DC.get_incons())
+    lookup = getattr(frontier.priority, "lookup", None)
+    if not nodes or lookup is None:
+        return cost
+    states = np.array([node.state for node in nodes])
+    g = np.array([node.g_score for node in nodes], dtype=float)
+    return min(cost, float((g + lookup.batch(states, nodes[0].goal.state)).min()))
 
 def reconstruct_path(start, current):
     path = []
@@ -106,7 +241,7 @@ if __name__ == "__main__":
 
     w1 = 10
     e = 2
-    time = 5
+    passes = 5
     h = [
         heuristics.heuristic_euclidean,
         heuristics.heuristic_manhattan,
@@ -114,9 +249,9 @@ if __name__ == "__main__":
         heuristics.heuristic_octile,
     ]
 
-    p = [P.Priority(h[i], w1, e, time) for i in range(len(h))]
+    p = [P.Priority(h[i], w1, e, passes, grid) for i in range(len(h))]
     dc = DC.DominanceCheck(DC.g_score_DC)
-    queue = PriorityQueue()
+    queue = make_queue(p[0], grid)
     frontier = GenericFrontier(queue, dc, p[0], grid)
     def goal_check(node):
         return node.state == goal.state
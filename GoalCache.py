@@ -0,0 +1,145 @@
+import sys
+import time
+import argparse
+from collections import OrderedDict
+import numpy as np
+import heuristics as heu
+import ArraySearch
+import Landmarks
+import Wavefront
+import Batch
+import Benchmark
+
+# Perfect heuristics for frequently requested goals. Once a goal has been asked for
+# promote times, its exact cost-to-goal field is computed and cached, so A* toward it
+# is guided by h = h*. The cache is bounded by the total size of the fields, evicting
+# the least recently used goal, and every set_cells edit drops the fields, which are
+# rebuilt the next time their goal is requested.
+
+def cost_to_goal(grid, goal):
+    """d(., goal) over the whole grid as an H x W float64 array, inf where the goal
+    cannot be reached, from one backward sweep."""
+    return Wavefront.distance_field(grid, [goal], reverse=True)
+
+class GoalCache:
+    """Heuristic callable: exact for cached goals, base otherwise. Like Landmarks, its
+    version counts the grid edits seen."""
+    def __init__(self, grid, base, max_bytes=64 * 2**20, promote=2):
+        self.grid = grid
+        self.base = base
+        self.max_bytes = max_bytes
+        self.promote = promote
+        self.fields = OrderedDict()
+        self.requests = {}
+        self.oversize = set()
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.builds = 0
+        self.version = 0
+        self.integral = heu.is_integral(base)
+        self.consistent = heu.is_consistent(base, grid.connectivity)
+        grid.watchers.append(self.cells_changed)
+
+    def field(self, goal):
+        """The cached field for goal, building it if goal has become hot; None if not."""
+        goal = tuple(goal)
+        field = self.fields.get(goal)
+        if field is not None:
+            self.fields.move_to_end(goal)
+            self.hits += 1
+            return field
+        self.requests[goal] = self.requests.get(goal, 0) + 1
+        if self.requests[goal] < self.promote or goal in self.oversize:
+            self.misses += 1
+            return None
+        return self.build(goal)
+
+    def build(self, goal):
+        # A field takes at least two bytes per cell, so some grids never fit; a field
+        # that comes out in float32 and does not fit is not swept again until an edit.
+        if self.grid.width * self.grid.height * 2 > self.max_bytes:
+            self.oversize.add(goal)
+            self.misses += 1
+            return None
+        field = Landmarks.compact(cost_to_goal(self.grid, goal))
+        if field.nbytes > self.max_bytes:
+            self.oversize.add(goal)
+            self.misses += 1
+            return None
+        field.flags.writeable = False
+        self.builds += 1
+        self.fields[goal] = field
+        self.nbytes += field.nbytes
+        while self.nbytes > self.max_bytes:
+            _, evicted = self.fields.popitem(last=False)
+            self.nbytes -= evicted.nbytes
+        return field
+
+    def cells_changed(self, cells):
+        """Grid watcher: drop every field. Their goals stay hot, so each is rebuilt
+        on its next request."""
+        self.fields.clear()
+        self.oversize.clear()
+        self.nbytes = 0
+        self.version += 1
+
+    def table(self, goal, shape):
+        """Whole-grid values for heu.TABLES, which serves them instead of its own."""
+        field = self.field(goal)
+        if field is None:
+            return heu.TABLES.get(self.base, goal, shape)
+        return field
+
+    def __call__(self, state, goal):
+        field = self.fields.get(tuple(goal))
+        if field is None:
+            return self.base(state, goal)
+        return field.item(state)
+
+    def batch(self, states, goal):
+        field = self.fields.get(tuple(goal))
+        if field is None:
+            return heu.batch(self.base)(states, goal)
+        xs, ys = heu.coords(states)
+        return field[xs, ys].astype(np.float64)
+
+def goal_cache(grid, base, max_bytes=64 * 2**20, promote=2):
+    """The grid's cached GoalCache over base with these settings."""
+    key = ("goals", base, max_bytes, promote)
+    if key not in grid.caches:
+        grid.caches[key] = GoalCache(grid, base, max_bytes, promote)
+    return grid.caches[key]
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Answer queries toward a few depots with and without cached goal fields.")
+    parser.add_argument("--size", type=int, default=300)
+    parser.add_argument("--density", type=float, default=0.2)
+    parser.add_argument("--connectivity", type=int, default=8, choices=[4, 8])
+    parser.add_argument("--depots", type=int, default=3)
+    parser.add_argument("--queries", type=int, default=30)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    grid, _, _ = Benchmark.make_instance(args.size, args.density, args.connectivity, args.seed)
+    h, _ = Benchmark.instance_heuristics(grid)
+    cache = goal_cache(grid, h)
+    queries = Batch.random_queries(grid, args.queries, args.seed)
+    depots = queries[:args.depots, 2:]
+    goals = depots[np.random.default_rng(args.seed).integers(len(depots), size=len(queries))]
+    for name, heuristic in (("geometric", h), ("cached", cache)):
+        expanded, seconds = 0, 0.0
+        for (sx, sy), (gx, gy) in zip(queries[:, :2].tolist(), goals.tolist()):
+            space = ArraySearch.SearchSpace(grid)
+            began = time.perf_counter()
+            ArraySearch.weighted_A_star(space, grid.state_id((sx, sy)), grid.state_id((gx, gy)),
+                                        space.heuristic(heuristic, (gx, gy)), 1)
+            seconds += time.perf_counter() - began
+            expanded += space.expanded
+        print(f"{name:>9}: {expanded} expansions, {seconds:.3f}s")
+    print(f"cache: {len(cache.fields)} fields, {cache.nbytes} bytes, {cache.builds} builds, "
+          f"{cache.hits} hits, {cache.misses} misses")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
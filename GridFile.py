@@ -0,0 +1,77 @@
+import sys
+import time
+import struct
+import argparse
+import numpy as np
+import Util
+import MovingAI
+
+# Native on-disk grid: a fixed header followed by the raw row-major cost array. The
+# data starts on a page boundary, so load can hand the file straight to np.memmap and
+# processes opening the same file share its pages through the page cache.
+
+MAGIC = b"GRIDWLD\0"
+VERSION = 1
+# magic, version, connectivity, height, width, dtype (numpy str, e.g. "|u1"), data offset
+HEADER = struct.Struct("<8sHH4xQQ8sQ")
+DATA_OFFSET = 4096
+# Rows copied per block when writing, so saving never holds a second full copy.
+BLOCK_BYTES = 64 << 20
+
+def read_header(path):
+    with open(path, "rb") as f:
+        raw = f.read(HEADER.size)
+    if len(raw) < HEADER.size:
+        raise ValueError(f"{path} is too short to be a grid file")
+    magic, version, connectivity, height, width, dtype, offset = HEADER.unpack(raw)
+    if magic != MAGIC:
+        raise ValueError(f"{path} is not a grid file")
+    if version != VERSION:
+        raise ValueError(f"{path} has unsupported grid file version {version}")
+    return {"connectivity": connectivity, "shape": (height, width),
+            "dtype": np.dtype(dtype.rstrip(b"\0").decode("ascii")), "offset": offset}
+
+def save(costs, path, connectivity=8, dtype=None):
+    """Write a (height, width) cost array, or a Gridworld, as a grid file. dtype
+    defaults to the smallest unsigned type holding the largest cost."""
+    if isinstance(costs, Util.Gridworld):
+        costs, connectivity = costs.grid, costs.connectivity
+    costs = np.asanyarray(costs)
+    if costs.size and costs.min() < 0:
+        raise ValueError("grid costs must be non-negative")
+    top = int(costs.max()) if costs.size else 0
+    dtype = np.min_scalar_type(top) if dtype is None else np.dtype(dtype)
+    if dtype.kind not in "ui" or np.iinfo(dtype).max < top:
+        raise ValueError(f"costs up to {top} do not fit in {dtype}")
+    height, width = costs.shape
+    with open(path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, connectivity, height, width,
+                            dtype.str.encode("ascii"), DATA_OFFSET).ljust(DATA_OFFSET, b"\0"))
+        rows = max(1, BLOCK_BYTES // max(1, width * dtype.itemsize))
+        for i in range(0, height, rows):
+            f.write(np.ascontiguousarray(costs[i:i + rows], dtype=dtype).tobytes())
+
+def load(path, mode="r", connectivity=None, tables=False):
+    """Gridworld over a memory-mapped grid file. mode is the np.memmap mode: "r" for
+    read-only, "r+" to write set_cells edits through to the file, "c" for private
+    copy-on-write edits. tables=False keeps searches to the pages they expand."""
+    header = read_header(path)
+    costs = np.memmap(path, dtype=header["dtype"], mode=mode, offset=header["offset"], shape=header["shape"])
+    return Util.Gridworld.from_array(costs, connectivity or header["connectivity"], tables)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Convert a MovingAI .map file to a grid file.")
+    parser.add_argument("map")
+    parser.add_argument("output")
+    parser.add_argument("--connectivity", type=int, default=8, choices=[4, 8])
+    args = parser.parse_args(argv)
+
+    began = time.perf_counter()
+    with open(args.map) as f:
+        save(MovingAI.parse_map(f.read()), args.output, args.connectivity)
+    grid = load(args.output)
+    print(f"wrote {grid.height}x{grid.width} {grid.grid.dtype} grid in {time.perf_counter() - began:.3f}s")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,416 @@
+import sys
+import math
+import time
+import heapq
+import argparse
+import numpy as np
+import Util
+import ArraySearch
+
+# Hierarchical path-finding (HPA*, Botea, Mueller and Schaeffer, 2004). The grid is cut
+# into square clusters. Wherever two side-by-side clusters share a run of traversable
+# border cells, one or two transitions are placed on it, and the cells on both sides of a
+# transition become abstract nodes. Costs between the nodes of one cluster come from a
+# Dijkstra restricted to the cluster, run for every node of many clusters at once as a
+# NumPy wavefront. A query links start and goal into their clusters, searches the small
+# abstract graph and refines each abstract edge back to cells, lazily if asked.
+# Moving from u costs grid[u], so an abstract edge a -> b costs what its cells do, and
+# the refined path costs exactly what the abstract search found.
+
+CLUSTER_SIZE = 16
+# Border runs at least this long get a transition at each end instead of one mid-run.
+LONG_RUN = 6
+# Padded cells per wavefront batch (clusters x nodes x cluster area).
+BATCH_CELLS = 1 << 15
+
+def _shift(d, n):
+    """(target, source) slices along one axis so that target = source + d."""
+    if d >= 0:
+        return slice(d, n), slice(0, n - d)
+    return slice(0, n + d), slice(-d, n)
+
+def _spread(a, axis):
+    """Minimum of each entry of a and its two neighbors along axis."""
+    out = a.copy()
+    lo = [slice(None)] * a.ndim
+    hi = [slice(None)] * a.ndim
+    lo[axis], hi[axis] = slice(0, -1), slice(1, None)
+    lo, hi = tuple(lo), tuple(hi)
+    np.minimum(out[hi], a[lo], out=out[hi])
+    np.minimum(out[lo], a[hi], out=out[lo])
+    return out
+
+def wavefront(costs, dist, directions, reverse=False):
+    """Shortest distances over the last two axes of costs (0 blocks), relaxed from dist
+    until nothing changes. Forward, dist[v] = min over neighbors u of dist[u] + costs[u]
+    for traversable v (cost from the sources); reverse, dist[v] = costs[v] + min over
+    traversable neighbors w of dist[w] (cost to the sources). Leading axes are
+    independent problems and broadcast between costs and dist; sources are the entries
+    of dist already finite."""
+    h, w = dist.shape[-2:]
+    moves = [(_shift(dx, h), _shift(dy, w)) for dx, dy in directions]
+    free = costs > 0
+    while True:
+        source = np.where(free, dist, np.inf) if reverse else dist + costs
+        if len(directions) == 8:
+            # The 3x3 neighborhood minimum is separable. It includes v itself, which
+            # never wins since costs are non-negative.
+            reach = _spread(_spread(source, -1), -2)
+        else:
+            reach = np.full_like(dist, np.inf)
+            for (tx, sx), (ty, sy) in moves:
+                np.minimum(reach[..., tx, ty], source[..., sx, sy], out=reach[..., tx, ty])
+        if reverse:
+            new = np.minimum(dist, reach + costs)
+        else:
+            new = np.where(free, np.minimum(dist, reach), dist)
+        if np.array_equal(new, dist):
+            return new
+        dist = new
+
+class Abstraction:
+    def __init__(self, grid, cluster_size=CLUSTER_SIZE):
+        self.grid = grid
+        self.size = cluster_size
+        self.rows = -(-grid.height // cluster_size)
+        self.cols = -(-grid.width // cluster_size)
+        self.directions = grid.directions()
+        # transitions per border, abstract nodes per cluster, and directed edges between
+        # nodes: inter[a] maps b in a side-by-side cluster to grid[a], intra[a] lists
+        # (b, cost) for the nodes of a's own cluster.
+        self.borders = {}
+        self.nodes = {}
+        self.inter = {}
+        self.intra = {}
+        self.build()
+        grid.watchers.append(self.cells_changed)
+
+    def cluster(self, u):
+        x, y = divmod(u, self.grid.width)
+        return (x // self.size) * self.cols + y // self.size
+
+    def origin(self, k):
+        bx, by = divmod(k, self.cols)
+        return bx * self.size, by * self.size
+
+    def cluster_borders(self, k):
+        """Keys of k's borders: ("v", bx, by) lies between clusters (bx, by) and
+        (bx, by + 1), ("h", bx, by) between (bx, by) and (bx + 1, by). With diagonal
+        moves, clusters meeting only at a corner share one too: ("d", bx, by) between
+        (bx, by) and (bx + 1, by + 1), ("a", bx, by) between (bx, by + 1) and (bx + 1, by)."""
+        bx, by = divmod(k, self.cols)
+        right, down = by + 1 < self.cols, bx + 1 < self.rows
+        keys = []
+        if right:
+            keys.append(("v", bx, by))
+        if by > 0:
+            keys.append(("v", bx, by - 1))
+        if down:
+            keys.append(("h", bx, by))
+        if bx > 0:
+            keys.append(("h", bx - 1, by))
+        if len(self.directions) == 8:
+            if down and right:
+                keys.append(("d", bx, by))
+            if bx > 0 and by > 0:
+                keys.append(("d", bx - 1, by - 1))
+            if down and by > 0:
+                keys.append(("a", bx, by - 1))
+            if bx > 0 and right:
+                keys.append(("a", bx - 1, by))
+        return keys
+
+    def border_clusters(self, key):
+        kind, bx, by = key
+        k = bx * self.cols + by
+        return {"v": (k, k + 1), "h": (k, k + self.cols),
+                "d": (k, k + self.cols + 1), "a": (k + 1, k + self.cols)}[kind]
+
+    def build(self):
+        for k in range(self.rows * self.cols):
+            for key in self.cluster_borders(k):
+                if key not in self.borders:
+                    self.set_border(key)
+        self.set_clusters(range(self.rows * self.cols))
+
+    def transitions(self, key):
+        """(a, b) cell id pairs across a border, a on the first cluster's side."""
+        kind, bx, by = key
+        costs, c, width = self.grid.grid, self.size, self.grid.width
+        if kind in "da":
+            x, y = (bx + 1) * c, (by + 1) * c
+            a, b = ((x - 1, y - 1), (x, y)) if kind == "d" else ((x - 1, y), (x, y - 1))
+            return [(a[0] * width + a[1], b[0] * width + b[1])] if costs[a] and costs[b] else []
+        if kind == "v":
+            lo, hi = bx * c, min(self.grid.height, (bx + 1) * c)
+            line = (by + 1) * c - 1
+            sides = costs[lo:hi, line] != 0, costs[lo:hi, line + 1] != 0
+
+            def cell(p, side):
+                return p * width + line + side
+        else:
+            lo, hi = by * c, min(width, (by + 1) * c)
+            line = (bx + 1) * c - 1
+            sides = costs[line, lo:hi] != 0, costs[line + 1, lo:hi] != 0
+
+            def cell(p, side):
+                return (line + side) * width + p
+        both = sides[0] & sides[1]
+        edges = np.flatnonzero(np.diff(np.concatenate(([0], both.view(np.int8), [0]))))
+        pairs = []
+        for first, stop in zip(edges[0::2].tolist(), edges[1::2].tolist()):
+            if stop - first < LONG_RUN:
+                picks = [(first + stop - 1) // 2]
+            else:
+                picks = [first, stop - 1]
+            pairs.extend((cell(lo + p, 0), cell(lo + p, 1)) for p in picks)
+        if len(self.directions) == 8:
+            # A diagonal step across the border is only needed where neither of its
+            # cells is on a straight run, which already connects both sides there.
+            alone = ~both[:-1] & ~both[1:]
+            for p in np.flatnonzero(alone & sides[0][:-1] & sides[1][1:]).tolist():
+                pairs.append((cell(lo + p, 0), cell(lo + p + 1, 1)))
+            for p in np.flatnonzero(alone & sides[0][1:] & sides[1][:-1]).tolist():
+                pairs.append((cell(lo + p + 1, 0), cell(lo + p, 1)))
+        return pairs
+
+    def set_border(self, key):
+        costs = self.grid.grid.reshape(-1)
+        for a, b in self.borders.get(key, ()):
+            for u, v in ((a, b), (b, a)):
+                del self.inter[u][v]
+                if not self.inter[u]:
+                    del self.inter[u]
+        pairs = self.transitions(key)
+        for a, b in pairs:
+            self.inter.setdefault(a, {})[b] = int(costs[a])
+            self.inter.setdefault(b, {})[a] = int(costs[b])
+        changed = pairs != self.borders.get(key)
+        self.borders[key] = pairs
+        return changed
+
+    def local_costs(self, ks):
+        """(len(ks), size, size) costs of clusters ks, padded with obstacles."""
+        c = self.size
+        out = np.zeros((len(ks), c, c), dtype=np.float32)
+        for i, k in enumerate(ks):
+            x0, y0 = self.origin(k)
+            block = self.grid.grid[x0:x0 + c, y0:y0 + c]
+            out[i, :block.shape[0], :block.shape[1]] = block
+        return out
+
+    def fields(self, ks, sources, reverse=False):
+        """Wavefront per cluster in ks from each of its source cells (at once), as a
+        (len(ks), most sources, size, size) array in cluster-local coordinates."""
+        c = self.size
+        dist = np.full((len(ks), max(1, max(map(len, sources))), c, c), np.inf, dtype=np.float32)
+        for i, (k, ids) in enumerate(zip(ks, sources)):
+            x0, y0 = self.origin(k)
+            for j, u in enumerate(ids):
+                x, y = divmod(u, self.grid.width)
+                dist[i, j, x - x0, y - y0] = 0
+        return wavefront(self.local_costs(ks)[:, None], dist, self.directions, reverse)
+
+    def set_clusters(self, ks):
+        for k in ks:
+            for u in self.nodes.get(k, ()):
+                self.intra.pop(u, None)
+            nodes = set()
+            for key in self.cluster_borders(k):
+                side = 0 if self.border_clusters(key)[0] == k else 1
+                nodes.update(pair[side] for pair in self.borders[key])
+            self.nodes[k] = sorted(nodes)
+        # Batch clusters with similar node counts so little of each batch is padding.
+        ks = sorted((k for k in ks if len(self.nodes[k]) > 1), key=lambda k: len(self.nodes[k]))
+        area = self.size * self.size
+        chunks, chunk = [], []
+        for k in ks:
+            if chunk and (len(chunk) + 1) * len(self.nodes[k]) * area > BATCH_CELLS:
+                chunks.append(chunk)
+                chunk = []
+            chunk.append(k)
+        for chunk in chunks + [chunk]:
+            dist = self.fields(chunk, [self.nodes[k] for k in chunk])
+            for d, k in zip(dist, chunk):
+                nodes = self.nodes[k]
+                x0, y0 = self.origin(k)
+                xs, ys = np.divmod(np.array(nodes), self.grid.width)
+                matrix = d[:len(nodes), xs - x0, ys - y0].tolist()
+                for a, row in zip(nodes, matrix):
+                    self.intra[a] = [(b, cost) for b, cost in zip(nodes, row) if b != a and cost < math.inf]
+
+    def cells_changed(self, cells):
+        """Grid watcher: redo the borders and clusters the edited cells touch."""
+        c = self.size
+        ks = set(((cells[:, 0] // c) * self.cols + cells[:, 1] // c).tolist())
+        dirty = set(ks)
+        for key in {key for k in ks for key in self.cluster_borders(k)}:
+            if self.set_border(key):
+                dirty.update(self.border_clusters(key))
+        self.set_clusters(dirty)
+
+    def links(self, k, u, ids, reverse=False):
+        """(v, cost) for each id v of cluster k reachable from u inside it, or from
+        which u is reachable when reverse."""
+        x0, y0 = self.origin(k)
+        xs, ys = np.divmod(np.array(ids, dtype=np.int64), self.grid.width)
+        d = self.fields([k], [[u]], reverse)[0, 0]
+        return [(v, cost) for v, cost in zip(ids, d[xs - x0, ys - y0].tolist()) if v != u and cost < math.inf]
+
+    def query(self, start, goal, h, weight=1, deadline=None):
+        """A* over the abstract graph with start and goal linked in. Returns (waypoints,
+        cost, expanded): the abstract path as cell ids and its cost, (None, None, ...)
+        when the goal is unreachable or the deadline passed, and the expanded ids."""
+        grid = self.grid
+        s, t = grid.state_id(start), grid.state_id(goal)
+        ks, kt = self.cluster(s), self.cluster(t)
+        first = self.links(ks, s, self.nodes[ks] + ([t] if ks == kt else []))
+        last = dict(self.links(kt, t, self.nodes[kt], reverse=True))
+
+        intra, inter, width = self.intra, self.inter, grid.width
+        heappush, heappop = heapq.heappush, heapq.heappop
+        g = {s: 0}
+        parent = {s: None}
+        hs = {}
+        heap = [(weight * h(start, goal), s)]
+        closed = set()
+        expanded = generated = 0
+        peak_open = 1
+        while heap:
+            if deadline is not None and deadline.expired():
+                break
+            _, u = heappop(heap)
+            if u in closed:
+                continue
+            closed.add(u)
+            if u == t:
+                break
+            expanded += 1
+            gu = g[u]
+            exits = [(t, last[u])] if u in last else ()
+            for edges in (first if u == s else intra.get(u, ()), inter[u].items() if u in inter else (), exits):
+                for v, cost in edges:
+                    generated += 1
+                    gv = gu + cost
+                    if gv < g.get(v, math.inf) and v not in closed:
+                        g[v] = gv
+                        parent[v] = u
+                        hv = hs.get(v)
+                        if hv is None:
+                            hv = hs[v] = weight * h(divmod(v, width), goal)
+                        heappush(heap, (gv + hv, v))
+            # Every reached node not yet closed is on the open list.
+            peak_open = max(peak_open, len(g) - len(closed))
+        Util.stats.expanded += expanded
+        Util.stats.generated += generated
+        Util.stats.open_size(peak_open)
+        if t not in closed:
+            return None, None, closed
+        waypoints = [t]
+        while parent[waypoints[-1]] is not None:
+            waypoints.append(parent[waypoints[-1]])
+        waypoints.reverse()
+        return waypoints, g[t], closed
+
+    def segment(self, a, b):
+        """Cheapest cells from a to b, both ids: a single step across a border, or a
+        descent through a's cluster field otherwise."""
+        width = self.grid.width
+        k = self.cluster(a)
+        if self.cluster(b) != k:
+            return [divmod(a, width), divmod(b, width)]
+        x0, y0 = self.origin(k)
+        d = self.fields([k], [[a]])[0, 0]
+        costs = self.local_costs([k])[0]
+        c = self.size
+        x, y = divmod(b, width)
+        x, y = x - x0, y - y0
+        ax, ay = divmod(a, width)
+        ax, ay = ax - x0, ay - y0
+        cells = [(x + x0, y + y0)]
+        while (x, y) != (ax, ay):
+            for dx, dy in self.directions:
+                px, py = x - dx, y - dy
+                if 0 <= px < c and 0 <= py < c and d[px, py] + costs[px, py] == d[x, y]:
+                    x, y = px, py
+                    break
+            else:
+                raise ValueError("cluster field does not lead back to the segment start")
+            cells.append((x + x0, y + y0))
+        cells.reverse()
+        return cells
+
+    def segments(self, waypoints):
+        """Refine waypoints one abstract edge at a time, as lists of (x, y) cells that
+        each start where the last one ended."""
+        for a, b in zip(waypoints, waypoints[1:]):
+            yield self.segment(a, b)
+
+    def refine(self, waypoints):
+        cells = [divmod(waypoints[0], self.grid.width)]
+        for part in self.segments(waypoints):
+            cells.extend(part[1:])
+        return Util.PathView(np.array(cells, dtype=np.int32).reshape(-1, 2))
+
+def abstraction(grid, cluster_size=CLUSTER_SIZE):
+    """The grid's cached Abstraction, built on first use and kept current by set_cells."""
+    key = ("hpa", cluster_size)
+    if key not in grid.caches:
+        grid.caches[key] = Abstraction(grid, cluster_size)
+    return grid.caches[key]
+
+def A_star(grid, start, goal, h, weight, incumbent=None, deadline=None, cluster_size=CLUSTER_SIZE):
+    """Astar.A_star through the abstraction: the path is near optimal rather than
+    optimal, and open_set and closed_set hold abstract nodes."""
+    if not grid.path_exists(start, goal):
+        return None, {start.state}, set(), None
+    hpa = abstraction(grid, cluster_size)
+    waypoints, cost, closed = hpa.query(start.state, goal, h, weight, deadline)
+    closed_set = ArraySearch.id_states(grid, list(closed))
+    if waypoints is None:
+        return None, set(), closed_set, None
+    path = hpa.refine(waypoints)
+    cost += start.g_score
+    if incumbent is not None:
+        incumbent.offer(cost, path)
+    return path, set(), closed_set, cost
+
+def main(argv=None):
+    # Benchmark imports Astar, which imports this module.
+    import Benchmark
+    import Batch
+    parser = argparse.ArgumentParser(description="Compare HPA* with A* on random queries over one grid.")
+    parser.add_argument("--size", type=int, default=512)
+    parser.add_argument("--density", type=float, default=0.2)
+    parser.add_argument("--connectivity", type=int, default=8, choices=[4, 8])
+    parser.add_argument("--cluster", type=int, default=CLUSTER_SIZE)
+    parser.add_argument("--queries", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    grid, _, _ = Benchmark.make_instance(args.size, args.density, args.connectivity, args.seed)
+    h, _ = Benchmark.instance_heuristics(grid)
+    began = time.perf_counter()
+    hpa = abstraction(grid, args.cluster)
+    nodes = sum(map(len, hpa.nodes.values()))
+    print(f"abstraction: {nodes} nodes, {time.perf_counter() - began:.3f}s")
+
+    hpa_seconds = astar_seconds = ratio = 0
+    solved = 0
+    for sx, sy, gx, gy in Batch.random_queries(grid, args.queries, args.seed).tolist():
+        start = Benchmark.start_node((sx, sy), (gx, gy))
+        began = time.perf_counter()
+        path, _, _, cost = A_star(grid, start, (gx, gy), h, 1, cluster_size=args.cluster)
+        hpa_seconds += time.perf_counter() - began
+        began = time.perf_counter()
+        _, _, _, best = ArraySearch.A_star(grid, start, (gx, gy), h, 1)
+        astar_seconds += time.perf_counter() - began
+        if path is not None and best:
+            solved += 1
+            ratio += cost / best
+    print(f"{solved}/{args.queries} solved, HPA* {hpa_seconds:.3f}s, A* {astar_seconds:.3f}s, "
+          f"mean cost ratio {ratio / max(1, solved):.4f}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,11 +1,12 @@
 import math
+import time
 import Queues as Q
 import Priority as P
 import Util as Util
 import heuristics as heuristics
 import DC as DC
 import User
-from typing import Callable, List, Tuple, Optional
+from typing import Callable, Iterator, List, Tuple, Optional
 from abc import ABC, abstractmethod
 
 class AbstractSuccessorGenerator(ABC):
@@ -74,17 +75,9 @@ class successorGenerator(AbstractSuccessorGenerator):
 
     def __call__(self, node: Util.AbstractNode) -> List[Util.AbstractNode]:
         x, y = node.state
-        directions = [(0, 1), (1, 0), (0, -1), (-1, 0)]
-        if self.grid.connectivity == 8:
-            directions.extend([(-1, -1), (-1, 1), (1, -1), (1, 1)])
-
-        result: List[Util.AbstractNode] = []
-        for dx, dy in directions:
-            nx, ny = x + dx, y + dy
-            if self.grid.is_traversable(nx, ny):
-                result.append(Util.Node((nx, ny), node, node.g_score + self.grid.grid[x][y], node.goal))
-
-        return result
+        g_score = node.g_score + self.grid.grid[x][y]
+        id_state = self.grid.id_state
+        return [Util.Node(id_state(v), node, g_score, node.goal) for v in self.grid.neighbors(x * self.grid.width + y)]
 
 class GenericFrontier(AbstractFrontier):
     def __init__(self, queue: Q.PriorityQueue, DC: DC.DominanceCheck, getSucc: AbstractSuccessorGenerator) -> None:
@@ -164,21 +157,41 @@ class MultiFrontier(AbstractMultiFrontier):
         
 def search(start: Util.AbstractNode, goal_check: Callable[[Util.AbstractNode], bool], frontier: MultiFrontier, 
         checkStop = User.checkStop, update = User.updateGeneric) -> Tuple[List[List[Tuple[int, int]]], List[float]]:
-    frontier.insert(start)
     paths: List[List[Tuple[int, int]]] = []
     costs: List[float] = []
+    for path, cost, _, _ in search_stream(start, goal_check, frontier, checkStop, update):
+        paths.append(path)
+        costs.append(cost)
+    return paths, costs
+
+def search_stream(start: Util.AbstractNode, goal_check: Callable[[Util.AbstractNode], bool], frontier: MultiFrontier,
+        checkStop = User.checkStop, update = User.updateGeneric) -> Iterator[Tuple[List[Tuple[int, int]], float, float, float]]:
+    """Generator form of search: yields (path, cost, bound, elapsed) as soon as each pass
+    finds a path. Closing the generator stops the search."""
+    began: float = time.perf_counter()
+    frontier.insert(start)
     while checkStop(frontier):
         curr: Optional[Util.AbstractNode] = None
         while not frontier.is_empty():
             curr = frontier.peek()[1]
             if goal_check(curr):
-                paths.append(reconstruct_path(start, curr))
-                costs.append(curr.g_score)
+                cost: float = curr.g_score
+                yield reconstruct_path(start, curr), cost, bound(frontier, cost), time.perf_counter() - began
                 break
             node = frontier.remove()
             frontier.expand_node(node)
         update(frontier)
-    return paths, costs
+
+def bound(frontier: AbstractFrontier, cost: float) -> float:
+    """Suboptimality bound on cost: no path is cheaper than the least g + h over the
+    (anchor) frontier's open and inconsistent nodes."""
+    anchor: GenericFrontier = getattr(frontier, "anchor", frontier)
+    heuristic = anchor.queue.priority.heuristic
+    nodes: List[Util.AbstractNode] = anchor.queue.get_nodes() + list(anchor.DC.get_incons())
+    lower: float = min([cost] + [node.g_score + heuristic(node, node.goal) for node in nodes])
+    if lower <= 0:
+        return 1.0 if cost == 0 else math.inf
+    return max(1.0, cost / lower)
 
 def reconstruct_path(start: Util.AbstractNode, current: Util.AbstractNode) -> List[Tuple[int, int]]:
     path: List[Tuple[int, int]] = []
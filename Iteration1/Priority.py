@@ -1,5 +1,6 @@
 from abc import ABC, abstractmethod
-from typing import Callable
+from typing import Callable, Dict, List, Tuple
+import numpy as np
 import Util
 
 class AbstractPriorityFunction(ABC):
@@ -22,6 +23,7 @@ class Priority(AbstractPriorityFunction):
         self.w1: float = w1
         self.e: float = e
         self.time: int = time
+        self.h: Dict[Tuple[object, object], float] = {}
 
     def valid(self) -> bool:
         return self.w1 >= 1 and self.time > 0
@@ -30,6 +32,19 @@ class Priority(AbstractPriorityFunction):
         self.w1 = max(self.w1 - self.e, 1)
         self.time -= 1
 
+    def lookup(self, node: Util.AbstractNode) -> float:
+        key = (node.state, node.goal.state)
+        h = self.h.get(key)
+        if h is None:
+            h = self.h[key] = self.heuristic(node, node.goal)
+        return h
+
     def __call__(self, node: Util.AbstractNode) -> float:
         g = node.g_score
-        return self.w1 * self.heuristic(node, node.goal) + g
+        return self.w1 * self.lookup(node) + g
+
+    def batch(self, nodes: List[Util.AbstractNode]) -> List[float]:
+        n = len(nodes)
+        g = np.fromiter((node.g_score for node in nodes), dtype=float, count=n)
+        h = np.fromiter((self.lookup(node) for node in nodes), dtype=float, count=n)
+        return (g + self.w1 * h).tolist()
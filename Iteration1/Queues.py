@@ -29,6 +29,10 @@ class AbstractPriorityQueue(ABC, Generic[T]):
     def get_nodes(self) -> List[T]:
         pass
 
+    @abstractmethod
+    def rebuild(self, nodes: List[T]) -> None:
+        pass
+
 
 class PriorityQueue(AbstractPriorityQueue[T]):
     def __init__(self, priority: Callable[[T], float]) -> None:
@@ -53,3 +57,9 @@ class PriorityQueue(AbstractPriorityQueue[T]):
 
     def get_nodes(self) -> List[T]:
         return [node for _, node in self.heap]
+
+    def rebuild(self, nodes: List[T]) -> None:
+        batch = getattr(self.priority, "batch", None)
+        priorities: List[float] = batch(nodes) if batch is not None else [self.priority(node) for node in nodes]
+        self.heap = list(zip(priorities, nodes))
+        heapq.heapify(self.heap)
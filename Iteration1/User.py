@@ -2,16 +2,11 @@ def checkStop(frontier):
     return frontier.queue.priority.valid()
 
 def updateGeneric(frontier):
-    open = []
-    for p,node in frontier.queue.heap:
-        open.append(node)
+    open = frontier.queue.get_nodes()
     incons = frontier.DC.get_incons()
     new_open = open + incons
-    frontier.queue.clear()
     frontier.DC.clear()
-    
-    for node in new_open:
-        frontier.insert(node)
+    frontier.queue.rebuild(new_open)
     
     frontier.queue.priority.update()
 
@@ -141,6 +141,11 @@ class Gridworld(AbstractGridworld):
         self.grid: np.ndarray = np.random.randint(1, max_cost + 1, (height, width))
         self.connectivity: int = connectivity
         self.grid[np.random.rand(height, width) < obstacle_prob] = 0
+        self.adj_degree: int = 8 if connectivity == 8 else 4
+        self.adj_offsets: Optional[np.ndarray] = None
+        self.adj_counts: Optional[np.ndarray] = None
+        self.adj_neighbors: Optional[np.ndarray] = None
+        self.adj_costs: Optional[np.ndarray] = None
         self.log_filename: str = "grid_log.txt"
 
         open(self.log_filename, "w").close()
@@ -157,19 +162,71 @@ class Gridworld(AbstractGridworld):
     def is_traversable(self, x: int, y: int) -> bool:
         return self.is_within_bounds(x, y) and self.grid[x, y] != 0
 
-    def expand_node(self, node: Node) -> List["Node"]:
-        x, y = node.state
+    def state_id(self, state: Tuple[int, int]) -> int:
+        return state[0] * self.width + state[1]
+
+    def id_state(self, i: int) -> Tuple[int, int]:
+        return divmod(i, self.width)
+
+    def directions(self) -> List[Tuple[int, int]]:
         directions = [(0, 1), (1, 0), (0, -1), (-1, 0)]
         if self.connectivity == 8:
             directions.extend([(-1, -1), (-1, 1), (1, -1), (1, 1)])
+        return directions
+
+    # Successor tables in CSR layout: row u spans adj_offsets[u]:adj_offsets[u] + adj_counts[u]
+    # of adj_neighbors/adj_costs. Rows have a fixed stride of adj_degree so that
+    # set_cells can rewrite the rows around an edit in place.
+    def build_adjacency(self) -> None:
+        size = self.width * self.height
+        k = self.adj_degree
+        self.adj_offsets = np.arange(size + 1, dtype=np.int64) * k
+        self.adj_counts = np.zeros(size, dtype=np.int32)
+        self.adj_neighbors = np.full(size * k, -1, dtype=np.int32)
+        self.adj_costs = np.zeros(size * k, dtype=self.grid.dtype)
+        self._write_adjacency(np.arange(size, dtype=np.int64))
+
+    def _write_adjacency(self, ids: np.ndarray) -> None:
+        k = self.adj_degree
+        flat = self.grid.reshape(-1)
+        xs, ys = np.divmod(ids, self.width)
+        rows = np.empty((len(ids), k), dtype=np.int64)
+        for j, (dx, dy) in enumerate(self.directions()):
+            nx, ny = xs + dx, ys + dy
+            inside = (nx >= 0) & (nx < self.height) & (ny >= 0) & (ny < self.width)
+            v = np.where(inside, nx * self.width + ny, 0)
+            rows[:, j] = np.where(inside & (flat[v] != 0), v, -1)
+        valid = rows >= 0
+        order = np.argsort(~valid, axis=1, kind="stable")
+        rows = np.take_along_axis(rows, order, axis=1)
+        counts = valid.sum(axis=1)
+        slots = (ids * k)[:, None] + np.arange(k)
+        self.adj_counts[ids] = counts
+        self.adj_neighbors[slots] = rows
+        self.adj_costs[slots] = np.where(rows >= 0, flat[ids][:, None], 0)
+
+    def neighbors(self, u: int) -> List[int]:
+        if self.adj_counts is None:
+            self.build_adjacency()
+        start = u * self.adj_degree
+        return self.adj_neighbors[start:start + self.adj_counts[u]].tolist()
+
+    def set_cells(self, cells, costs) -> None:
+        cells = np.asarray(cells, dtype=np.int64).reshape(-1, 2)
+        self.grid[cells[:, 0], cells[:, 1]] = costs
+        if self.adj_counts is not None:
+            ids = cells[:, 0] * self.width + cells[:, 1]
+            touched = [ids]
+            for dx, dy in self.directions():
+                nx, ny = cells[:, 0] + dx, cells[:, 1] + dy
+                inside = (nx >= 0) & (nx < self.height) & (ny >= 0) & (ny < self.width)
+                touched.append(nx[inside] * self.width + ny[inside])
+            self._write_adjacency(np.unique(np.concatenate(touched)))
 
-        result: List[Node] = []
-        for dx, dy in directions:
-            nx, ny = x + dx, y + dy
-            if self.is_traversable(nx, ny):
-                result.append(Node((nx, ny), node, node.g_score + self.grid[x][y], node.goal))
-
-        return result
+    def expand_node(self, node: Node) -> List["Node"]:
+        x, y = node.state
+        g_score = node.g_score + self.grid[x][y]
+        return [Node(self.id_state(v), node, g_score, node.goal) for v in self.neighbors(x * self.width + y)]
 
     def draw_grid(self, paths: List[List[Tuple[int, int]]], costs: List[int]) -> None:
         if not paths:
@@ -0,0 +1,158 @@
+import sys
+import time
+import argparse
+import numpy as np
+import heuristics as heu
+import ArraySearch
+import Wavefront
+
+# ALT heuristics (Goldberg and Harrelson, 2005): exact distances from a few landmarks
+# bound the distance between any two cells through the triangle inequality. Moving from
+# u costs grid[u], so distances are not symmetric, but reversing a path between two
+# traversable cells only swaps which endpoint is paid for: d(v, L) = d(L, v) + grid[v] -
+# grid[L]. One field D = d(L, .) per landmark therefore gives both bounds
+#     d(v, t) >= D[t] - D[v]    and    d(v, t) >= D[v] - D[t] + grid[v] - grid[t],
+# each consistent, as is their maximum over landmarks.
+
+def distances(grid, source):
+    """d(source, .) over the whole grid as an H x W float64 array, inf where unreachable."""
+    return Wavefront.distance_field(grid, [source])
+
+def compact(field):
+    """field in uint16, with 65535 for unreachable cells, when every distance fits;
+    float32 (exact for integer costs below 2**24) otherwise."""
+    finite = np.isfinite(field)
+    if not finite.any() or field[finite].max() < 65535:
+        return np.where(finite, field, 65535).astype(np.uint16)
+    return field.astype(np.float32)
+
+class Landmarks:
+    """Heuristic callable h(state, goal) from k landmarks, with the batch, integral and
+    consistent attributes the queues and heu.TABLES look for. Its values depend on the
+    grid: version counts the edits seen, so holders of looked-up values can tell when
+    theirs are stale."""
+    integral = True
+    consistent = True
+
+    def __init__(self, grid, k=8, seed=0):
+        self.grid = grid
+        self.k = k
+        self.seed = seed
+        self.cells = []
+        self.fields = None
+        self.version = 0
+        self.select()
+        grid.watchers.append(self.cells_changed)
+
+    def select(self):
+        """Farthest-point landmarks: the first is the cell farthest from a random cell of
+        the largest component, each next one the cell farthest from those chosen."""
+        grid = self.grid
+        labels = grid.components()
+        free = labels >= 0
+        if not free.any():
+            self.cells, self.fields = [], np.zeros((0, grid.height, grid.width), dtype=np.uint16)
+            return
+        largest = np.bincount(labels[free]).argmax()
+        rng = np.random.default_rng(self.seed)
+        seed = grid.id_state(int(rng.choice(np.flatnonzero(labels == largest))))
+        nearest = distances(grid, seed)
+        self.cells = []
+        fields = []
+        for _ in range(self.k):
+            reached = np.where(np.isfinite(nearest), nearest, -1)
+            cell = tuple(int(i) for i in np.unravel_index(reached.argmax(), reached.shape))
+            if reached[cell] <= 0:
+                break
+            field = distances(grid, cell)
+            self.cells.append(cell)
+            fields.append(compact(field))
+            nearest = field if len(fields) == 1 else np.minimum(nearest, field)
+        self.fields = np.stack(fields)
+
+    def refresh(self):
+        if any(not self.grid.is_traversable(*cell) for cell in self.cells):
+            self.select()
+        else:
+            self.fields = np.stack([compact(distances(self.grid, cell)) for cell in self.cells])
+
+    def cells_changed(self, cells):
+        """Grid watcher: edits can shorten distances, so the fields are recomputed on
+        next use and tables built from them dropped."""
+        self.fields = None
+        self.version += 1
+        heu.TABLES.discard(self)
+
+    def unreached(self):
+        return 65535 if self.fields.dtype == np.uint16 else np.inf
+
+    def __call__(self, state, goal):
+        if self.fields is None:
+            self.refresh()
+        costs, unreached = self.grid.grid, self.unreached()
+        dc = costs.item(state) - costs.item(goal)
+        best = 0
+        for field in self.fields:
+            dv, dt = field.item(state), field.item(goal)
+            if dv != unreached and dt != unreached:
+                best = max(best, dt - dv, dv - dt + dc)
+        return best
+
+    def batch(self, states, goal):
+        if self.fields is None:
+            self.refresh()
+        xs, ys = np.broadcast_arrays(*heu.coords(states))
+        costs, unreached = self.grid.grid, self.unreached()
+        dc = costs[xs, ys].astype(np.float64) - costs.item(goal)
+        best = np.zeros(xs.shape)
+        for field in self.fields:
+            dt = field.item(goal)
+            if dt == unreached:
+                continue
+            dv = field[xs, ys].astype(np.float64)
+            bound = np.maximum(dt - dv, dv - dt + dc)
+            np.maximum(best, np.where(dv != unreached, bound, 0), out=best)
+        return best
+
+def landmarks(grid, k=8, seed=0):
+    """The grid's cached Landmarks, selected on first use."""
+    key = ("alt", k, seed)
+    if key not in grid.caches:
+        grid.caches[key] = Landmarks(grid, k, seed)
+    return grid.caches[key]
+
+def main(argv=None):
+    # Benchmark imports this module for its astar-alt entry.
+    import Benchmark
+    import Batch
+    parser = argparse.ArgumentParser(description="Compare A* expansions under ALT and the geometric heuristics.")
+    parser.add_argument("--size", type=int, default=300)
+    parser.add_argument("--density", type=float, default=0.2)
+    parser.add_argument("--connectivity", type=int, default=8, choices=[4, 8])
+    parser.add_argument("--landmarks", type=int, default=8)
+    parser.add_argument("--queries", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    grid, _, _ = Benchmark.make_instance(args.size, args.density, args.connectivity, args.seed)
+    h, _ = Benchmark.instance_heuristics(grid)
+    began = time.perf_counter()
+    alt = landmarks(grid, args.landmarks, args.seed)
+    print(f"{len(alt.cells)} landmarks, {alt.fields.nbytes} bytes of {alt.fields.dtype}, "
+          f"{time.perf_counter() - began:.3f}s")
+
+    totals = {"geometric": [0, 0.0], "alt": [0, 0.0]}
+    for sx, sy, gx, gy in Batch.random_queries(grid, args.queries, args.seed).tolist():
+        for name, heuristic in (("geometric", h), ("alt", alt)):
+            space = ArraySearch.SearchSpace(grid)
+            began = time.perf_counter()
+            ArraySearch.weighted_A_star(space, grid.state_id((sx, sy)), grid.state_id((gx, gy)),
+                                        space.heuristic(heuristic, (gx, gy)), 1)
+            totals[name][0] += space.expanded
+            totals[name][1] += time.perf_counter() - began
+    for name, (expanded, seconds) in totals.items():
+        print(f"{name:>9}: {expanded} expansions, {seconds:.3f}s")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,120 @@
+import sys
+import json
+import time
+import argparse
+from collections import namedtuple
+import numpy as np
+import Util
+import Benchmark
+
+# Loader for the MovingAI grid benchmark format (https://movingai.com/benchmarks/formats.html).
+# MovingAI coordinates are (x, y) = (column, row); Gridworld states are (row, column),
+# so scenario endpoints are swapped on load.
+
+# Cell cost per terrain character, 0 marking an obstacle. Water and trees are only
+# passable under rules the Gridworld successor model has no notion of, so they block.
+TERRAIN = {".": 1, "G": 1, "S": 1, "@": 0, "O": 0, "T": 0, "W": 0}
+
+Scenario = namedtuple("Scenario", ["bucket", "map", "start", "goal", "optimal"])
+
+def terrain_table(terrain):
+    table = np.full(256, -1, dtype=np.int16)
+    for char, cost in terrain.items():
+        table[ord(char)] = cost
+    return table
+
+def parse_map(text, terrain=TERRAIN):
+    """Cost array of shape (height, width) for the text of a .map file."""
+    lines = text.splitlines()
+    header = {}
+    i = 0
+    while lines[i].strip() != "map":
+        key, value = lines[i].split(None, 1)
+        header[key] = value.strip()
+        i += 1
+    height, width = int(header["height"]), int(header["width"])
+    rows = lines[i + 1:i + 1 + height]
+    if len(rows) != height or any(len(row) < width for row in rows):
+        raise ValueError(f"map body does not match its {height}x{width} header")
+    chars = np.frombuffer("".join(row[:width] for row in rows).encode("ascii"), dtype=np.uint8)
+    costs = terrain_table(terrain)[chars]
+    if (costs < 0).any():
+        unknown = sorted({chr(c) for c in np.unique(chars[costs < 0])})
+        raise ValueError(f"unknown terrain characters {unknown}")
+    return costs.astype(np.int64).reshape(height, width)
+
+def load_map(path, connectivity=8, terrain=TERRAIN):
+    with open(path) as f:
+        return Util.Gridworld.from_array(parse_map(f.read(), terrain), connectivity)
+
+def load_scen(path):
+    """Scenarios of a .scen file in file order. optimal is the length stored in the
+    file, measured with MovingAI's octile unit costs rather than Gridworld costs."""
+    scenarios = []
+    with open(path) as f:
+        for line in f:
+            fields = line.split()
+            if not fields or fields[0] == "version":
+                continue
+            bucket = int(fields[0])
+            sx, sy, gx, gy = map(int, fields[4:8])
+            scenarios.append(Scenario(bucket, fields[1], (sy, sx), (gy, gx), float(fields[8])))
+    return scenarios
+
+def batches(scenarios, size):
+    for i in range(0, len(scenarios), size):
+        yield scenarios[i:i + size]
+
+def run_scenarios(grid, scenarios, algorithm="astar-array"):
+    """Run each scenario through a Benchmark.ALGORITHMS entry and yield one record per
+    query as it completes."""
+    fn = Benchmark.ALGORITHMS[algorithm]
+    for scenario in scenarios:
+        Util.stats.reset()
+        began = time.perf_counter()
+        path, cost = fn(grid, scenario.start, scenario.goal)
+        record = {"bucket": scenario.bucket, "start": scenario.start, "goal": scenario.goal,
+                  "optimal": scenario.optimal, "seconds": time.perf_counter() - began,
+                  "cost": None if path is None else float(cost),
+                  "path_length": None if path is None else len(path)}
+        record.update(Util.stats.as_dict())
+        yield record
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run MovingAI scenarios through a search algorithm.")
+    parser.add_argument("map")
+    parser.add_argument("scen")
+    parser.add_argument("--algorithm", default="astar-array", choices=list(Benchmark.ALGORITHMS))
+    parser.add_argument("--connectivity", type=int, default=8, choices=[4, 8])
+    parser.add_argument("--buckets", nargs="+", type=int, help="only run these buckets")
+    parser.add_argument("--limit", type=int, help="stop after this many scenarios")
+    parser.add_argument("--output", help="write per-query records as JSON lines to this file")
+    args = parser.parse_args(argv)
+
+    began = time.perf_counter()
+    grid = load_map(args.map, args.connectivity)
+    scenarios = load_scen(args.scen)
+    if args.buckets:
+        scenarios = [s for s in scenarios if s.bucket in args.buckets]
+    scenarios = scenarios[:args.limit]
+    print(f"loaded {grid.height}x{grid.width} map and {len(scenarios)} scenarios "
+          f"in {time.perf_counter() - began:.3f}s", file=sys.stderr)
+
+    out = open(args.output, "w") if args.output else None
+    began = time.perf_counter()
+    solved = 0
+    try:
+        for record in run_scenarios(grid, scenarios, args.algorithm):
+            solved += record["cost"] is not None
+            if out:
+                out.write(json.dumps(record) + "\n")
+    finally:
+        if out:
+            out.close()
+    seconds = time.perf_counter() - began
+    print(f"{solved}/{len(scenarios)} solved in {seconds:.3f}s "
+          f"({len(scenarios) / seconds if seconds else 0:.1f} queries/s)")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,10 +1,14 @@
 import Util
 import math
 import heuristics as heu
+import ArraySearch
+import ParallelMHA
 
 def imha_star(grid, start, goal, heuristics, weights):
+    if not grid.path_exists(start, goal):
+        return None, {start.state}, set(), None
     w1, w2 = weights
-    open = [Util.PQ() for _ in range(len(heuristics))]  # n+1 priority queues
+    open = [Util.IndexedPQ() for _ in range(len(heuristics))]  # n+1 priority queues
     open_sets = [set([start.state]) for _ in range(len(heuristics))]
     closed_set = [set() for _ in range(len(heuristics))]
     
@@ -42,9 +46,17 @@ def imha_star(grid, start, goal, heuristics, weights):
     
     return None, open_sets[0], closed_set[0], None
 
-def smha_star(grid, start, goal, heuristics, weights):
+def smha_star(grid, start, goal, heuristics, weights, backend="node", incumbent=None, deadline=None):
+    if backend == "array":
+        return ArraySearch.smha_star(grid, start, goal, heuristics, weights, incumbent, deadline)
+    if backend == "parallel":
+        if incumbent is not None or deadline is not None:
+            raise ValueError("the parallel backend takes no incumbent or deadline")
+        return ParallelMHA.smha_star(grid, start, goal, heuristics, weights)
+    if not grid.path_exists(start, goal):
+        return None, {start.state}, set(), None
     w1, w2 = weights
-    open = [Util.PQ() for _ in range(len(heuristics))]  # n+1 priority queues
+    open = [Util.IndexedPQ() for _ in range(len(heuristics))]  # n+1 priority queues
     open_sets = [set([start.state]) for _ in range(len(heuristics))]
     closed_anchor = set()
     closed_inad = set()
@@ -53,6 +65,8 @@ def smha_star(grid, start, goal, heuristics, weights):
         open[i].push(start, heuristics[i](start.state, goal) * w1)
     
     while not open[0].isEmpty():
+        if deadline is not None and deadline.expired():
+            break
         for i in range(1, len(heuristics)):
             if not open[i].isEmpty() and open[i].peek()[0] <= w2 * open[0].peek()[0]:
                 current = open[i].pop()
@@ -62,6 +76,8 @@ def smha_star(grid, start, goal, heuristics, weights):
                     return reconstruct_path(current, start, goal), open_sets[i], closed_inad, current.g_score
                 for neighbor in current.expand_node(grid):
                     g = neighbor.g_score
+                    if incumbent is not None and g + heuristics[0](neighbor.state, goal) >= incumbent.cost:
+                        continue
                     if neighbor.state not in closed_anchor:
                         h_score = w1*heuristics[i](neighbor.state, goal)
                         f = h_score + g
@@ -71,7 +87,7 @@ def smha_star(grid, start, goal, heuristics, weights):
                             for i in range(1, len(heuristics)):
                                 open[i].update((neighbor), f)
                                 open_sets[i].add(neighbor.state)
-            else:
+            elif not open[0].isEmpty():
                 current = open[0].pop()
                 open_sets[0].remove(current.state)
                 closed_anchor.add(current.state)
@@ -79,6 +95,8 @@ def smha_star(grid, start, goal, heuristics, weights):
                     return reconstruct_path(current, start, goal), open_sets[0], closed_anchor, current.g_score
                 for neighbor in current.expand_node(grid):
                     g = neighbor.g_score
+                    if incumbent is not None and g + heuristics[0](neighbor.state, goal) >= incumbent.cost:
+                        continue
                     if neighbor.state not in closed_anchor:
                         h_score = heuristics[i](neighbor.state, goal)
                         f = h_score + g
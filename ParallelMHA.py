@@ -0,0 +1,191 @@
+import math
+import heapq
+import queue
+import multiprocessing as mp
+import numpy as np
+import Util
+import ArraySearch
+import Batch
+
+# Shared-memory SMHA*. The anchor queue runs in the calling process and every
+# inadmissible queue in a process of its own. g, parent and both closed lists live in
+# shared arrays updated under one lock; each process keeps only its own heap. States
+# whose g a process improves are broadcast to the other queues through their inboxes,
+# and the receiver keys them with its own heuristic. An inadmissible queue may only
+# expand while its top key is within w2 times the anchor's, which the anchor publishes
+# in a shared value, so the w1 * w2 bound of sequential SMHA* still holds.
+
+# Improved states are broadcast after this many expansions, or sooner when idle.
+FLUSH = 16
+# Seconds an idle queue waits on its inbox before rechecking the stop flag.
+IDLE_WAIT = 0.01
+
+class SharedSearch:
+    def __init__(self, size, n):
+        self.g = mp.RawArray('d', size)
+        self.parent = mp.RawArray('i', size)
+        self.closed_anchor = mp.RawArray('b', size)
+        self.closed_inad = mp.RawArray('b', size)
+        self.expanded = mp.RawArray('q', n)
+        self.generated = mp.RawArray('q', n)
+        self.peak_open = mp.RawArray('q', n)
+        self.anchor_key = mp.RawValue('d', 0.0)
+        self.stop = mp.RawValue('b', 0)
+        self.lock = mp.Lock()
+        self.inboxes = [mp.Queue() for _ in range(n)]
+        np.frombuffer(self.g, dtype=np.float64)[:] = math.inf
+        np.frombuffer(self.parent, dtype=np.int32)[:] = -1
+
+def view(raw, dtype):
+    return memoryview(np.frombuffer(raw, dtype=dtype))
+
+def run_queue(i, grid, shared, h, start, goal, weights):
+    """Expand queue i (0 is the anchor) until the search stops."""
+    w1, w2 = weights
+    g, parent = view(shared.g, np.float64), view(shared.parent, np.int32)
+    closed = view(shared.closed_anchor if i == 0 else shared.closed_inad, np.int8)
+    costs = memoryview(np.ascontiguousarray(grid.grid).reshape(-1))
+    degree, counts, neighbors = grid.adj_degree, memoryview(grid.adj_counts), memoryview(grid.adj_neighbors)
+    lock, stop, anchor_key = shared.lock, shared.stop, shared.anchor_key
+    inbox = shared.inboxes[i]
+    others = [box for j, box in enumerate(shared.inboxes) if j != i]
+    heappush, heappop = heapq.heappush, heapq.heappop
+    heap = [(g[start] + w1 * h(start), start)]
+    # Heap entries per state; this queue's open list is the states with any.
+    held = {start: 1}
+    pending = []
+    expanded = generated = 0
+    peak_open = 1
+
+    def push(key, v):
+        heappush(heap, (key, v))
+        held[v] = held.get(v, 0) + 1
+
+    def pop():
+        u = heappop(heap)[1]
+        if held[u] == 1:
+            del held[u]
+        else:
+            held[u] -= 1
+        return u
+
+    def receive(ids):
+        for v in ids:
+            if not closed[v]:
+                push(g[v] + w1 * h(v), v)
+
+    def flush():
+        if pending:
+            for box in others:
+                box.put(pending[:])
+            pending.clear()
+
+    while not stop.value:
+        try:
+            while True:
+                receive(inbox.get_nowait())
+        except queue.Empty:
+            pass
+        while heap:
+            f, u = heap[0]
+            if not closed[u] and f == g[u] + w1 * h(u):
+                break
+            pop()
+        key = heap[0][0] if heap else math.inf
+
+        if i == 0:
+            anchor_key.value = key
+            if g[goal] <= w2 * key and (heap or g[goal] < math.inf):
+                stop.value = 1
+                break
+            runnable = bool(heap)
+        else:
+            if g[goal] <= key < math.inf and key <= w2 * anchor_key.value:
+                stop.value = 1
+                break
+            runnable = key <= w2 * anchor_key.value
+        if not runnable:
+            flush()
+            try:
+                receive(inbox.get(timeout=IDLE_WAIT))
+            except queue.Empty:
+                pass
+            continue
+
+        u = pop()
+        improved = []
+        reached = []
+        with lock:
+            if closed[u]:
+                continue
+            closed[u] = 1
+            gu = g[u] + costs[u]
+            row = u * degree
+            for v in neighbors[row:row + counts[u]]:
+                if gu < g[v]:
+                    g[v] = gu
+                    parent[v] = u
+                    improved.append(v)
+                elif gu == g[v]:
+                    reached.append(v)
+        expanded += 1
+        generated += counts[u]
+        # A tie means another queue got there first and its broadcast may still be in
+        # flight; queue the state now so this heap never lacks a state it generated.
+        for v in improved + reached:
+            if not closed[v]:
+                push(gu + w1 * h(v), v)
+        if len(held) > peak_open:
+            peak_open = len(held)
+        pending.extend(improved)
+        if expanded % FLUSH == 0:
+            flush()
+
+    shared.expanded[i] = expanded
+    shared.generated[i] = generated
+    shared.peak_open[i] = peak_open
+    return heap
+
+def _worker(i, specs, connectivity, shared, h, start, goal, weights):
+    grid, blocks = Batch.attach(specs, connectivity)
+    for box in shared.inboxes:
+        box.cancel_join_thread()
+    run_queue(i, grid, shared, ArraySearch.heuristic_lookup(grid, h, grid.id_state(goal)), start, goal, weights)
+
+def smha_star(grid, start, goal, heuristics, weights):
+    """SMHA* with one process per inadmissible heuristic; same signature and result
+    as MultiHeuristic.smha_star."""
+    if not grid.path_exists(start, goal):
+        return None, {start.state}, set(), None
+    n = len(heuristics)
+    s, t = grid.state_id(start.state), grid.state_id(goal)
+    shared = SharedSearch(grid.width * grid.height, n)
+    shared.g[s] = start.g_score
+
+    with Batch.SharedGrid(grid) as shared_grid:
+        workers = [mp.Process(target=_worker, args=(i, shared_grid.specs, grid.connectivity, shared,
+                                                    heuristics[i], s, t, weights), daemon=True)
+                   for i in range(1, n)]
+        for worker in workers:
+            worker.start()
+        try:
+            heap = run_queue(0, grid, shared, ArraySearch.heuristic_lookup(grid, heuristics[0], goal), s, t, weights)
+        finally:
+            shared.stop.value = 1
+            for worker in workers:
+                worker.join()
+        for box in shared.inboxes:
+            box.cancel_join_thread()
+            box.close()
+
+    Util.stats.expanded += sum(shared.expanded)
+    Util.stats.generated += sum(shared.generated)
+    Util.stats.open_size(max(shared.peak_open))
+    closed_anchor = np.frombuffer(shared.closed_anchor, dtype=np.int8)
+    closed = closed_anchor | np.frombuffer(shared.closed_inad, dtype=np.int8)
+    open_set = ArraySearch.id_states(grid, [v for _, v in heap if not closed_anchor[v]])
+    closed_set = ArraySearch.id_states(grid, np.flatnonzero(closed))
+    if shared.g[t] == math.inf:
+        return None, open_set, closed_set, None
+    path = Util.PathView(Util.extract_path(np.frombuffer(shared.parent, dtype=np.int32), t, grid.width))
+    return path, open_set, closed_set, shared.g[t]
@@ -0,0 +1,124 @@
+import sys
+import time
+import queue
+import argparse
+import multiprocessing as mp
+import numpy as np
+import Util
+import ATAstar
+import ARAstar
+import APTS
+import AMHAstar
+import potential as pt
+import Batch
+import Benchmark
+
+# Algorithm portfolio: several anytime searches run at once in separate processes on one
+# shared grid. They share a Util.Incumbent, so each prunes nodes whose g + h cannot beat
+# the best solution any member has found, and report every improvement back to the
+# runner. Members stop themselves at the deadline; any still running shortly after it
+# are terminated, and the runner returns the best path reported.
+
+def run_atastar(grid, start, goal, incumbent, deadline, backend="array"):
+    h, _ = Benchmark.instance_heuristics(grid)
+    ATAstar.anytime_A_star(grid, Benchmark.start_node(start, goal), goal, h, 5, 1, 10, backend, incumbent, deadline)
+
+def run_arastar(grid, start, goal, incumbent, deadline, backend="array"):
+    h, _ = Benchmark.instance_heuristics(grid)
+    ARAstar.ARA_star(grid, Benchmark.start_node(start, goal), goal, h, 5, 1, 10, backend, incumbent, deadline)
+
+def run_apts(grid, start, goal, incumbent, deadline, backend=None):
+    h, _ = Benchmark.instance_heuristics(grid)
+    APTS.anytime_potential_search(grid, Benchmark.start_node(start, goal), goal, int(grid.grid.sum()),
+                                  pt.linear, h, 1, 50, incumbent, deadline)
+
+def run_amhastar(grid, start, goal, incumbent, deadline, backend="array"):
+    _, hs = Benchmark.instance_heuristics(grid)
+    AMHAstar.anytime(grid, Benchmark.start_node(start, goal), goal, hs, (5, 5),
+                     AMHAstar.update_weight, AMHAstar.valid_weight, 10, backend, incumbent, deadline)
+
+MEMBERS = {
+    "atastar": run_atastar,
+    "arastar": run_arastar,
+    "apts": run_apts,
+    "amhastar": run_amhastar,
+}
+
+def _member(name, specs, connectivity, tables, start, goal, incumbent, results, began, end):
+    grid, blocks = Batch.attach(specs, connectivity, tables)
+
+    def report(cost, path):
+        path = np.asarray(getattr(path, "array", path), dtype=np.int32).reshape(-1, 2)
+        results.put((name, cost, path, time.monotonic() - began))
+    incumbent.listener = report
+    MEMBERS[name](grid, start, goal, incumbent, Util.Deadline((end - time.monotonic()) * 1000))
+    results.put((name, None, None, time.monotonic() - began))
+
+def portfolio(grid, start, goal, budget_ms, members=tuple(MEMBERS)):
+    """Run members on start -> goal for at most budget_ms milliseconds. Returns
+    (path, cost, bound, winner, log): the best path as a Util.PathView (None if no
+    member found one), its cost, its proven suboptimality bound, the member that found
+    it, and every (member, cost, seconds) improvement in arrival order."""
+    began = time.monotonic()
+    end = began + budget_ms / 1000
+    incumbent = Util.Incumbent()
+    results = mp.Queue()
+    best_cost, best_path, winner = float("inf"), None, None
+    log = []
+
+    with Batch.SharedGrid(grid) as shared:
+        processes = [mp.Process(target=_member, args=(name, shared.specs, shared.connectivity, shared.tables,
+                                                       start, goal, incumbent, results, began, end), daemon=True)
+                     for name in members]
+        for process in processes:
+            process.start()
+        running = len(processes)
+        try:
+            while running:
+                remaining = end - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    name, cost, path, seconds = results.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if cost is None:
+                    running -= 1
+                    continue
+                log.append((name, cost, seconds))
+                if cost < best_cost:
+                    best_cost, best_path, winner = cost, path, name
+        finally:
+            for process in processes:
+                if process.is_alive():
+                    process.terminate()
+                process.join()
+            results.cancel_join_thread()
+            results.close()
+
+    if best_path is None:
+        return None, None, incumbent.bound, None, log
+    return Util.PathView(best_path), best_cost, incumbent.bound, winner, log
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Race the anytime searches on a seeded grid.")
+    parser.add_argument("--size", type=int, default=200)
+    parser.add_argument("--density", type=float, default=0.2)
+    parser.add_argument("--connectivity", type=int, default=8, choices=[4, 8])
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--budget", type=float, default=1000, help="deadline in milliseconds")
+    parser.add_argument("--members", nargs="+", default=list(MEMBERS), choices=list(MEMBERS))
+    args = parser.parse_args(argv)
+
+    grid, start, goal = Benchmark.make_instance(args.size, args.density, args.connectivity, args.seed)
+    path, cost, bound, winner, log = portfolio(grid, start, goal, args.budget, args.members)
+    for name, c, seconds in log:
+        print(f"{seconds:8.3f}s {name:>10} {c}")
+    if path is None:
+        print("No path found")
+    else:
+        print(f"Best: {cost} from {winner}, {len(path)} states, within {bound:.3f} of optimal")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,39 +1,87 @@
 import Util
 import math
 import heapq
+import numpy as np
+import heuristics as heu
 
 class Priority():
-    def __init__(self, heuristic, w1 = 1, e = 0, time = 1):
+    def __init__(self, heuristic, w1 = 1, e = 0, time = 1, grid = None, deadline = None):
         self.heuristic = heuristic
+        self.lookup = heu.Lookup(heuristic, None if grid is None else grid.grid.shape)
         self.w1 = w1
         self.e = e
         self.time = time
+        self.deadline = deadline
 
     def valid(self):
-        return self.w1 >= 1 and self.time > 0
+        return self.w1 >= 1 and self.time > 0 and (self.deadline is None or not self.deadline.check())
     
     def update(self):
         self.w1 = max(self.w1 - self.e, 1)
         self.time -= 1
 
+    def integral(self):
+        return float(self.w1).is_integer() and float(self.e).is_integer() and heu.is_integral(self.heuristic)
+
     def __call__(self, node : Util.Node):
         state = node.state
         g = node.g_score
         goal_state = node.goal.state
-        p = self.w1*self.heuristic(state, goal_state) + g
+        p = self.w1*self.lookup(state, goal_state) + g
         return p
+
+    def batch(self, nodes):
+        states = np.array([node.state for node in nodes])
+        g = np.array([node.g_score for node in nodes], dtype=float)
+        return self.w1*self.lookup.batch(states, nodes[0].goal.state) + g
     
 
+class PriorityBalanced():
+    """Average potential for one side of a bidirectional search: g + (h(v, target) -
+    h(v, source)) / 2, where the node's goal is the target and source is where the side
+    started. The two sides' potentials cancel and each is consistent when h is, so the
+    two top keys add up to a lower bound on any path the search has not yet found."""
+    def __init__(self, heuristic, source, grid = None):
+        shape = None if grid is None else grid.grid.shape
+        self.heuristic = heuristic
+        self.lookup = heu.Lookup(heuristic, shape)
+        self.behind = heu.Lookup(heuristic, shape)
+        self.source = source
+        self.w1 = 1
+
+    def valid(self):
+        return True
+
+    def update(self):
+        pass
+
+    def integral(self):
+        return False
+
+    def __call__(self, node : Util.Node):
+        state = node.state
+        return node.g_score + (self.lookup(state, node.goal.state) - self.behind(state, self.source)) / 2
+
+    def batch(self, nodes):
+        states = np.array([node.state for node in nodes])
+        g = np.array([node.g_score for node in nodes], dtype=float)
+        return g + (self.lookup.batch(states, nodes[0].goal.state) - self.behind.batch(states, self.source)) / 2
+
+
 class PriorityPotential():
-    def __init__(self, heuristic):
+    def __init__(self, heuristic, grid = None, deadline = None):
         self.heuristic = heuristic
+        self.lookup = heu.Lookup(heuristic, None if grid is None else grid.grid.shape)
         self.w1 = 1
         self.w2 = 1
         self.budget = 200
         self.e = 0
         self.time = 1
+        self.deadline = deadline
 
     def valid(self):
+        if self.deadline is not None and self.deadline.check():
+            return False
         return self.w1 >= 1 and self.w2 >= 1 and self.budget > 0 and self.time > 0
     
     def update(self, cost):
@@ -42,6 +90,9 @@ class PriorityPotential():
         self.w2 -= max(self.w2 - self.e, 1)
         self.time -= 1
 
+    def integral(self):
+        return False
+
     def configure(self, w1, w2, budget, e, time):
         self.w1 = w1
         self.w2 = w2
@@ -53,13 +104,22 @@ class PriorityPotential():
         state = node.state
         g = node.g_score
         goal_state = node.goal.state
-        h = self.w1*self.heuristic(state, goal_state) 
+        h = self.w1*self.lookup(state, goal_state) 
         if h == 0:
             return 0
         if ((self.budget - g) <= 0):
             return math.inf
         return h/(self.budget - g)
 
+    def batch(self, nodes):
+        states = np.array([node.state for node in nodes])
+        g = np.array([node.g_score for node in nodes], dtype=float)
+        h = self.w1*self.lookup.batch(states, nodes[0].goal.state)
+        slack = self.budget - g
+        with np.errstate(divide="ignore", invalid="ignore"):
+            p = np.where(slack > 0, h/slack, math.inf)
+        return np.where(h == 0, 0, p)
+
 
 class PriorityQueue():
     def __init__(self, heuristic, grid):
@@ -2,6 +2,8 @@ import math
 import heapq
 from typing import Callable, List, Dict, Set, Tuple, Optional
 import Util
+import numpy as np
+import heuristics as heu
 
 #priority functions instead of heuristics
 #pass in expander function(knows what grid is), abstract class
@@ -36,6 +38,7 @@ class PriorityQueueOld:
         self.g_scores: Dict[any, float] = {}
         self.closed_set: Set[any] = set()
         self.incons_set: Set[Util.Node] = set()
+        self.h_scores: Dict[any, float] = {}
         self.w1: int = 10
         self.grid = grid
         self.push(start)
@@ -43,9 +46,18 @@ class PriorityQueueOld:
         self.g_scores[self.goal.state] = math.inf
     
     def insert(self, node: Util.Node, queue: List[Tuple[float, Util.Node]]) -> None:
-        priority = node.g_score + self.w1 * self.heuristic(node.state, node.goal.state)
-        heapq.heappush(queue, (priority, node))
-    
+        h = self.h_scores.get(node.state)
+        if h is None:
+            h = self.h_scores[node.state] = self.heuristic(node.state, node.goal.state)
+        heapq.heappush(queue, (node.g_score + self.w1 * h, node))
+    
+    def priorities(self, nodes: List[Util.Node]) -> List[float]:
+        # Every open or inconsistent node went through insert, so its h is cached.
+        n = len(nodes)
+        g = np.fromiter((node.g_score for node in nodes), dtype=float, count=n)
+        h = np.fromiter((self.h_scores[node.state] for node in nodes), dtype=float, count=n)
+        return (g + self.w1 * h).tolist()
+
     def push(self, node: Util.Node) -> None:
         if node.g_score < self.g_scores.get(node.state, math.inf):
             self.g_scores[node.state] = node.g_score
@@ -66,11 +78,11 @@ class PriorityQueueOld:
     def restart(self) -> bool:
         if self.w1 <= 1:
             return False
+        nodes: List[Util.Node] = [node for _, node in self.queue] + list(self.incons_set)
         new_queue: List[Tuple[float, Util.Node]] = []
-        for _, node in self.queue:
-            self.insert(node, new_queue)
-        for node in self.incons_set:
-            self.insert(node, new_queue)
+        if nodes:
+            new_queue = [(priority, node) for priority, node in zip(self.priorities(nodes), nodes) if priority < math.inf]
+            heapq.heapify(new_queue)
         self.queue = new_queue
         self.incons_set = set()
         self.closed_set = set()
@@ -164,6 +176,13 @@ class PotentialQueue(PriorityQueue):
             return
         priority = self.w1 * self.heuristic(node.state, node.goal.state) / (self.budget - node.g_score)
         heapq.heappush(queue, (priority, node))
+
+    def priorities(self, nodes: List[Util.Node]) -> List[float]:
+        states = np.array([node.state for node in nodes])
+        slack = self.budget - np.array([node.g_score for node in nodes], dtype=float)
+        h = self.w1 * heu.batch(self.heuristic)(states, self.goal.state)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return np.where(slack > 0, h / slack, math.inf).tolist()
     
     def restart(self) -> bool:
         if self.budget <= 0:
@@ -3,6 +3,13 @@ import matplotlib.colors as mcolors
 import numpy as np
 import logging
 import heapq
+import gc
+import math
+import time
+import multiprocessing as mp
+from contextlib import contextmanager
+from collections.abc import Sequence
+from array import array
 
 
 
@@ -92,7 +99,319 @@ class PQWithUpdate:
         
         logging.info(f"Priority queue contents logged as set: {queue_elements}")
 
+# Search counters read by the benchmark harness. Node.expand_node, the open lists and
+# the ArraySearch engines add to the module-level instance; reset it before a run.
+# Every backend counts the same way: expanded is the states expanded, generated the
+# successors those expansions produced, whether or not they improved anything, and
+# peak_open the most distinct states any one open list held at once (stale heap
+# entries not counted).
+class SearchStats:
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.expanded = 0
+        self.generated = 0
+        self.peak_open = 0
+
+    def open_size(self, size):
+        if size > self.peak_open:
+            self.peak_open = size
+
+    def as_dict(self):
+        return {"expanded": self.expanded, "generated": self.generated, "peak_open": self.peak_open}
+
+stats = SearchStats()
+
+def suboptimality(cost, lower):
+    """Bound on cost / optimal given a proven lower bound on the optimal cost."""
+    if cost == math.inf or (lower <= 0 and cost > 0):
+        return math.inf
+    return max(1.0, cost / lower) if cost > 0 else 1.0
+
+# Result of an anytime search: unpacks as (path, open_set, closed_set, cost) like every
+# other search, and carries lower, the proven lower bound on the optimal cost, and bound,
+# the suboptimality of cost that it proves (inf if none).
+class AnytimeResult(tuple):
+    def __new__(cls, path, open_set, closed_set, cost, lower):
+        result = super().__new__(cls, (path, open_set, closed_set, cost))
+        result.lower = lower
+        result.bound = suboptimality(cost, lower)
+        return result
+
+# Best solution cost found so far by any search sharing this object. The cost sits in
+# shared memory, so searches in other processes can prune against it; listener, when
+# set, is called with (cost, path) each time offer improves it. Searches also raise a
+# proven lower bound on the optimal cost, which gives the incumbent's suboptimality bound.
+class Incumbent:
+    def __init__(self, listener=None):
+        self.best = mp.RawValue('d', math.inf)
+        self.lower = mp.RawValue('d', 0.0)
+        self.lock = mp.Lock()
+        self.listener = listener
+
+    @property
+    def cost(self):
+        return self.best.value
+
+    @property
+    def bound(self):
+        return suboptimality(self.best.value, self.lower.value)
+
+    def raise_lower(self, lower):
+        with self.lock:
+            if lower > self.lower.value:
+                self.lower.value = lower
+
+    def offer(self, cost, path=None):
+        with self.lock:
+            if cost >= self.best.value:
+                return False
+            self.best.value = cost
+        if self.listener is not None:
+            self.listener(cost, path)
+        return True
+
+class Deadline:
+    """Wall-clock deadline ms milliseconds from now. expired() is cheap enough for an
+    expansion loop: it reads the clock once every stride calls. check() always reads it."""
+    def __init__(self, ms, stride=32):
+        self.end = time.monotonic() + ms / 1000
+        self.stride = stride
+        self.countdown = stride
+        self.passed = False
+
+    def expired(self):
+        self.countdown -= 1
+        if self.countdown > 0:
+            return self.passed
+        self.countdown = self.stride
+        return self.check()
+
+    def check(self):
+        if not self.passed:
+            self.passed = time.monotonic() >= self.end
+        return self.passed
+
+    def remaining(self):
+        return max(0.0, self.end - time.monotonic()) * 1000
+
+def state_key(item):
+    return getattr(item, "state", item)
+
+# Binary heap with a position map keyed by state, so a second path to the same cell
+# updates the existing entry in place instead of leaving a stale duplicate behind.
+class IndexedPQ:
+    def __init__(self, key=state_key):
+        self.heap = []
+        self.position = {}
+        self.key = key
+        self.count = 0
+        self.pushes = 0
+        self.pops = 0
+        self.max_size = 0
+
+    def __len__(self):
+        return len(self.heap)
+
+    def __contains__(self, item):
+        return self.key(item) in self.position
+
+    def isEmpty(self):
+        return len(self.heap) == 0
+
+    def peek(self):
+        priority, count, item = self.heap[0]
+        return priority, count, item
+
+    def priority(self, item):
+        return self.heap[self.position[self.key(item)]][0]
+
+    def push(self, item, priority):
+        self.update(item, priority)
+
+    def pop(self):
+        if not self.heap:
+            raise KeyError('pop from an empty priority queue')
+        entry = self.heap[0]
+        self._delete(0)
+        self.pops += 1
+        return entry[2]
+
+    def update(self, item, priority):
+        key = self.key(item)
+        i = self.position.get(key)
+        if i is None:
+            self._insert(key, item, priority)
+        elif priority < self.heap[i][0]:
+            self.heap[i] = [priority, self.count, item]
+            self.count += 1
+            self.pushes += 1
+            self._sift_up(i)
+
+    def change(self, item, priority):
+        key = self.key(item)
+        i = self.position.get(key)
+        if i is None:
+            self._insert(key, item, priority)
+            return
+        old = self.heap[i][0]
+        self.heap[i] = [priority, self.count, item]
+        self.count += 1
+        if priority < old:
+            self._sift_up(i)
+        else:
+            self._sift_down(i)
+
+    def remove(self, item):
+        i = self.position.get(self.key(item))
+        if i is not None:
+            self._delete(i)
+
+    def clear(self):
+        self.heap = []
+        self.position = {}
+
+    def rebuild(self, items, priorities):
+        """Replace the contents with items at priorities using one heapify rather than
+        an insert per item. Ties and repeated keys resolve as repeated update calls would."""
+        base = self.count
+        keys = list(map(self.key, items))
+        heap = [[priority, base + i, item] for i, (priority, item) in enumerate(zip(priorities, items))]
+        if len(set(keys)) < len(keys):
+            best = {}
+            for key, entry in zip(keys, heap):
+                kept = best.get(key)
+                if kept is None or entry[0] < kept[0]:
+                    best[key] = entry
+            heap = list(best.values())
+        heapq.heapify(heap)
+        self.heap = heap
+        self.position = {keys[entry[1] - base]: i for i, entry in enumerate(heap)}
+        self.count = base + len(keys)
+        self.pushes += len(heap)
+        self.max_size = max(self.max_size, len(heap))
+        stats.open_size(len(heap))
+
+    def _insert(self, key, item, priority):
+        self.heap.append([priority, self.count, item])
+        self.position[key] = len(self.heap) - 1
+        self.count += 1
+        self.pushes += 1
+        self.max_size = max(self.max_size, len(self.heap))
+        if self.max_size > stats.peak_open:
+            stats.peak_open = self.max_size
+        self._sift_up(len(self.heap) - 1)
+
+    def _delete(self, i):
+        heap = self.heap
+        del self.position[self.key(heap[i][2])]
+        last = heap.pop()
+        if i < len(heap):
+            heap[i] = last
+            self.position[self.key(last[2])] = i
+            self._sift_up(i)
+            self._sift_down(self.position[self.key(last[2])])
+
+    def _sift_up(self, i):
+        heap, position, key = self.heap, self.position, self.key
+        entry = heap[i]
+        rank = entry[:2]
+        while i > 0:
+            parent = (i - 1) >> 1
+            if heap[parent][:2] <= rank:
+                break
+            heap[i] = heap[parent]
+            position[key(heap[i][2])] = i
+            i = parent
+        heap[i] = entry
+        position[key(entry[2])] = i
+
+    def _sift_down(self, i):
+        heap, position, key = self.heap, self.position, self.key
+        size = len(heap)
+        entry = heap[i]
+        rank = entry[:2]
+        while True:
+            child = 2 * i + 1
+            if child >= size:
+                break
+            if child + 1 < size and heap[child + 1][:2] < heap[child][:2]:
+                child += 1
+            if rank <= heap[child][:2]:
+                break
+            heap[i] = heap[child]
+            position[key(heap[i][2])] = i
+            i = child
+        heap[i] = entry
+        position[key(entry[2])] = i
+
+# Node objects are freed in bulk at the end of a search, and parent chains are trees, so
+# reference counting reclaims them without the cyclic collector. Pausing it avoids
+# repeated full passes over millions of live Nodes; freeze also moves everything
+# already allocated out of the collector's view for the duration.
+@contextmanager
+def gc_paused(freeze=False):
+    enabled = gc.isenabled()
+    gc.disable()
+    if freeze:
+        gc.freeze()
+    try:
+        yield
+    finally:
+        if freeze:
+            gc.unfreeze()
+        if enabled:
+            gc.enable()
+
+# Walks a parent-id array (-1 marks the root) back from goal and returns the path as an
+# (N, 2) int32 array of (x, y) rows, start first.
+def extract_path(parent, goal, width):
+    ids = array('q')
+    current = goal
+    # A path can pass every id with an entry in parent and a root without one (a sparse
+    # parent stores only the ids a search wrote), plus one step to read the root's -1.
+    for _ in range(len(parent) + 2):
+        if current < 0:
+            break
+        ids.append(current)
+        current = parent[current]
+    else:
+        raise ValueError("parent array contains a cycle")
+    ids = np.frombuffer(ids, dtype=np.int64)[::-1]
+    path = np.empty((len(ids), 2), dtype=np.int32)
+    path[:, 0], path[:, 1] = np.divmod(ids, width)
+    return path
+
+# Read-only list-of-tuples view over an (N, 2) path array, for callers that index,
+# iterate or compare paths as [(x, y), ...]. The array itself is .array.
+class PathView(Sequence):
+    def __init__(self, array):
+        self.array = array
+
+    def __len__(self):
+        return len(self.array)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return PathView(self.array[i])
+        x, y = self.array[i].tolist()
+        return (x, y)
+
+    def __iter__(self):
+        return iter(map(tuple, self.array.tolist()))
+
+    def __eq__(self, other):
+        if not isinstance(other, Sequence):
+            return NotImplemented
+        return list(self) == list(other)
+
+    def __repr__(self):
+        return repr(list(self))
+
 class Node:
+    __slots__ = ("state", "parent", "g_score", "goal")
+
     def __init__(self, state, parent, g_score, goal):
         self.state = state
         self.parent = parent
@@ -118,26 +437,20 @@ class Node:
     
     def expand_node(self, grid):
         x, y = self.state
-        directions = [(0, 1), (1, 0), (0, -1), (-1, 0)]
-        if grid.connectivity == 8:
-            directions.extend([(-1, -1), (-1, 1), (1, -1), (1, 1)]) 
-
-        result = []
-        for dx, dy in directions:
-            nx, ny = x + dx, y + dy
-            if grid.is_traversable(nx, ny):
-                result.append(Node((nx, ny), self, self.g_score + grid.grid[x][y], self.goal))
-
-        return result
+        g_score = self.g_score + int(grid.grid[x, y])
+        intern_state = grid.intern_state
+        successors = [Node(intern_state(v), self, g_score, self.goal) for v in grid.neighbors(x * grid.width + y)]
+        stats.expanded += 1
+        stats.generated += len(successors)
+        return successors
 
 class Gridworld:
-    def __init__(self, width, height, obstacle_prob, max_cost, connectivity):
-        self.width = width
-        self.height = height
-        self.grid = np.random.randint(1, max_cost + 1, (height, width))
-        self.connectivity = connectivity
-        self.grid[np.random.rand(height, width) < obstacle_prob] = 0
-        self.log_filename = "grid_log.txt"
+    def __init__(self, width, height, obstacle_prob, max_cost, connectivity, compact=False):
+        grid = np.random.randint(1, max_cost + 1, (height, width))
+        grid[np.random.rand(height, width) < obstacle_prob] = 0
+        self.set_grid(grid, connectivity)
+        if compact:
+            self.compact()
 
         open(self.log_filename, "w").close()
 
@@ -147,12 +460,185 @@ class Gridworld:
             format="%(asctime)s - %(message)s"
         )
 
+    @classmethod
+    def from_array(cls, costs, connectivity=8, tables=True, compact=False):
+        """Gridworld over an existing (height, width) cost array, 0 marking obstacles.
+        With tables=False no whole-grid successor or component tables are built:
+        successors are read from the cells around each expanded state, so a search
+        over a memory-mapped array only touches the pages it expands."""
+        grid = cls.__new__(cls)
+        grid.set_grid(np.asanyarray(costs), connectivity)
+        grid.tables = tables
+        if compact:
+            grid.compact()
+        return grid
+
+    def set_grid(self, grid, connectivity):
+        self.height, self.width = grid.shape
+        self.grid = grid
+        self.connectivity = connectivity
+        self.adj_degree = 8 if connectivity == 8 else 4
+        self.adj_offsets = None
+        self.adj_counts = None
+        self.adj_neighbors = None
+        self.adj_costs = None
+        self.states = None
+        self.labels = None
+        self.tables = True
+        self.mask = None
+        # Structures other modules derive from the grid, by key, and callables told of
+        # every set_cells edit (with the (N, 2) array of edited cells) to keep them current.
+        self.caches = {}
+        self.watchers = []
+        self.log_filename = "grid_log.txt"
+
+    # Compact storage: costs in the smallest unsigned dtype that holds them, plus a
+    # traversability mask packed 8 cells per byte along each row (np.packbits order,
+    # so cell (x, y) is bit 7 - y % 8 of mask[x, y // 8]).
+    def compact(self):
+        if self.grid.size and self.grid.min() < 0:
+            raise ValueError("grid costs must be non-negative")
+        dtype = np.min_scalar_type(int(self.grid.max()) if self.grid.size else 0)
+        if self.grid.dtype != dtype:
+            self.grid = self.grid.astype(dtype)
+            if self.adj_costs is not None:
+                self.adj_costs = self.adj_costs.astype(dtype)
+        self.mask = np.packbits(self.grid != 0, axis=1)
+        return self
+
+    def free_cells(self, xs, ys):
+        """Traversability of in-bounds cells (xs[i], ys[i]), read from the mask when present."""
+        if self.mask is None:
+            return self.grid[xs, ys] != 0
+        return (self.mask[xs, ys >> 3] & (0x80 >> (ys & 7)).astype(np.uint8)) != 0
+
+    def free_grid(self):
+        if self.mask is None:
+            return self.grid != 0
+        return np.unpackbits(self.mask, axis=1, count=self.width).view(bool)
+
+    def nbytes(self):
+        return self.grid.nbytes + (0 if self.mask is None else self.mask.nbytes)
+
     def is_within_bounds(self, x, y):
         return 0 <= x < self.height and 0 <= y < self.width
     
     def is_traversable(self, x, y):
+        if self.mask is not None:
+            return self.is_within_bounds(x, y) and self.mask[x, y >> 3] & (0x80 >> (y & 7)) != 0
         return self.is_within_bounds(x, y) and self.grid[x, y] != 0
 
+    def state_id(self, state):
+        return state[0] * self.width + state[1]
+
+    def id_state(self, i):
+        return divmod(i, self.width)
+
+    # One shared (x, y) tuple per cell, so Nodes for the same cell do not each own a copy.
+    def intern_state(self, i):
+        if self.states is None:
+            # Without whole-grid tables only the cells actually reached are interned.
+            self.states = [None] * (self.width * self.height) if self.tables else {}
+        state = self.states[i] if self.tables else self.states.get(i)
+        if state is None:
+            state = self.states[i] = divmod(i, self.width)
+        return state
+
+    def directions(self):
+        directions = [(0, 1), (1, 0), (0, -1), (-1, 0)]
+        if self.connectivity == 8:
+            directions.extend([(-1, -1), (-1, 1), (1, -1), (1, 1)])
+        return directions
+
+    # Successor tables in CSR layout: row u spans adj_offsets[u]:adj_offsets[u] + adj_counts[u]
+    # of adj_neighbors/adj_costs. Rows have a fixed stride of adj_degree so that
+    # set_cells can rewrite the rows around an edit in place.
+    def build_adjacency(self):
+        size = self.width * self.height
+        k = self.adj_degree
+        self.adj_offsets = np.arange(size + 1, dtype=np.int64) * k
+        self.adj_counts = np.zeros(size, dtype=np.int32)
+        self.adj_neighbors = np.full(size * k, -1, dtype=np.int32)
+        self.adj_costs = np.zeros(size * k, dtype=self.grid.dtype)
+        self._write_adjacency(np.arange(size, dtype=np.int64))
+
+    def _write_adjacency(self, ids):
+        k = self.adj_degree
+        flat = self.grid.reshape(-1)
+        xs, ys = np.divmod(ids, self.width)
+        rows = np.empty((len(ids), k), dtype=np.int64)
+        for j, (dx, dy) in enumerate(self.directions()):
+            nx, ny = xs + dx, ys + dy
+            inside = (nx >= 0) & (nx < self.height) & (ny >= 0) & (ny < self.width)
+            nx, ny = np.where(inside, nx, 0), np.where(inside, ny, 0)
+            rows[:, j] = np.where(inside & self.free_cells(nx, ny), nx * self.width + ny, -1)
+        valid = rows >= 0
+        order = np.argsort(~valid, axis=1, kind="stable")
+        rows = np.take_along_axis(rows, order, axis=1)
+        counts = valid.sum(axis=1)
+        slots = (ids * k)[:, None] + np.arange(k)
+        self.adj_counts[ids] = counts
+        self.adj_neighbors[slots] = rows
+        self.adj_costs[slots] = np.where(rows >= 0, flat[ids][:, None], 0)
+
+    def neighbors(self, u):
+        if not self.tables:
+            return self._cell_neighbors(u)
+        if self.adj_counts is None:
+            self.build_adjacency()
+        start = u * self.adj_degree
+        return self.adj_neighbors[start:start + self.adj_counts[u]].tolist()
+
+    def _cell_neighbors(self, u):
+        x, y = divmod(u, self.width)
+        height, width, grid, mask = self.height, self.width, self.grid, self.mask
+        successors = []
+        for dx, dy in self.directions():
+            nx, ny = x + dx, y + dy
+            if 0 <= nx < height and 0 <= ny < width:
+                if grid[nx, ny] if mask is None else mask[nx, ny >> 3] & (0x80 >> (ny & 7)):
+                    successors.append(nx * width + ny)
+        return successors
+
+    def set_cells(self, cells, costs):
+        cells = np.asarray(cells, dtype=np.int64).reshape(-1, 2)
+        costs = np.asarray(costs)
+        if costs.size and self.grid.dtype.kind in "ui":
+            if costs.min() < 0:
+                raise ValueError("grid costs must be non-negative")
+            top = int(costs.max())
+            if top > np.iinfo(self.grid.dtype).max:
+                # A compacted grid is widened as compact() would; a mapped file cannot be.
+                dtype = np.promote_types(self.grid.dtype, np.min_scalar_type(top))
+                if isinstance(self.grid, np.memmap):
+                    raise ValueError(f"costs up to {top} do not fit in {self.grid.dtype}")
+                self.grid = self.grid.astype(dtype)
+                if self.adj_costs is not None:
+                    self.adj_costs = self.adj_costs.astype(dtype)
+        was_free = self.free_cells(cells[:, 0], cells[:, 1])
+        self.grid[cells[:, 0], cells[:, 1]] = costs
+        now_free = self.grid[cells[:, 0], cells[:, 1]] != 0
+        if self.mask is not None:
+            index = (cells[:, 0], cells[:, 1] >> 3)
+            bits = (0x80 >> (cells[:, 1] & 7)).astype(np.uint8)
+            np.bitwise_and.at(self.mask, index, ~bits)
+            np.bitwise_or.at(self.mask, (index[0][now_free], index[1][now_free]), bits[now_free])
+        if self.labels is not None:
+            if (was_free & ~now_free).any():
+                self.labels = None
+            else:
+                self._join_components(cells[~was_free & now_free, 0] * self.width + cells[~was_free & now_free, 1])
+        if self.adj_counts is not None:
+            ids = cells[:, 0] * self.width + cells[:, 1]
+            touched = [ids]
+            for dx, dy in self.directions():
+                nx, ny = cells[:, 0] + dx, cells[:, 1] + dy
+                inside = (nx >= 0) & (nx < self.height) & (ny >= 0) & (ny < self.width)
+                touched.append(nx[inside] * self.width + ny[inside])
+            self._write_adjacency(np.unique(np.concatenate(touched)))
+        for watcher in self.watchers:
+            watcher(cells)
+
     def draw_grid(self, paths=None, costs=None):
         if paths is None or len(paths) == 0:
             raise ValueError("No paths provided.")
@@ -191,25 +677,69 @@ class Gridworld:
 
 
     def path_exists(self, start, goal):
-        open_list = PQWithUpdate()
-        open_list.push((start), 1)
-        closed_set = set()
-
-        while not open_list.isEmpty():
-            current_node = open_list.pop()
-            closed_set.add(current_node.state)
-
-            if current_node.state == goal:
-                return True
+        start = getattr(start, "state", start)
+        if start == goal:
+            return True
+        if not self.is_traversable(*goal):
+            return False
+        if not self.tables:
+            # Without component labels, reachability is left to the search itself.
+            return self.is_traversable(*start) or bool(self.neighbors(self.state_id(start)))
+        labels = self.components()
+        label = labels[self.state_id(goal)]
+        if self.is_traversable(*start):
+            return labels[self.state_id(start)] == label
+        return any(labels[v] == label for v in self.neighbors(self.state_id(start)))
+
+    # Connected components of traversable cells under the grid's connectivity, as a flat
+    # array of labels (-1 for obstacles). Built by vectorized min-label hooking and
+    # pointer jumping, so the number of passes grows with log(size), not the diameter.
+    def components(self):
+        if self.labels is None:
+            self.labels = self._label_components()
+        return self.labels
+
+    def _label_components(self):
+        free = self.free_grid().reshape(-1)
+        ids = np.arange(self.width * self.height).reshape(self.height, self.width)
+        us, vs = [], []
+        for dx, dy in self.directions():
+            if (dx, dy) < (0, 0):
+                continue
+            src = ids[max(0, -dx):self.height - max(0, dx), max(0, -dy):self.width - max(0, dy)].reshape(-1)
+            dst = src + dx * self.width + dy
+            mask = free[src] & free[dst]
+            us.append(src[mask])
+            vs.append(dst[mask])
+        u, v = np.concatenate(us), np.concatenate(vs)
+        labels = ids.reshape(-1).copy()
+        while len(u):
+            lu, lv = labels[u], labels[v]
+            differ = lu != lv
+            u, v, lu, lv = u[differ], v[differ], lu[differ], lv[differ]
+            np.minimum.at(labels, np.maximum(lu, lv), np.minimum(lu, lv))
+            while True:
+                jumped = labels[labels]
+                if np.array_equal(jumped, labels):
+                    break
+                labels = jumped
+        labels[~free] = -1
+        return labels
+
+    def _join_components(self, ids):
+        labels = self.labels
+        for u in ids.tolist():
+            x, y = divmod(u, self.width)
+            near = {u}
+            for dx, dy in self.directions():
+                nx, ny = x + dx, y + dy
+                if self.is_traversable(nx, ny):
+                    near.add(int(labels[nx * self.width + ny]))
+            near.discard(-1)
+            root = min(near)
+            labels[np.isin(labels, list(near))] = root
+            labels[u] = root
 
-            for neighbor in current_node.expand_node(self):
-
-                if neighbor.state not in closed_set:
-                    h_score = 1
-                    open_list.update((neighbor), h_score)
-
-        return False
-    
     def log(self, elems, message): 
         with open(self.log_filename, "a") as log_file:
             log_file.write(f"{message} {elems}\n")
\ No newline at end of file
@@ -0,0 +1,125 @@
+import sys
+import time
+import heapq
+import argparse
+import numpy as np
+import ArraySearch
+
+# Whole-grid distance fields without a Python loop per cell. Costs are integers, so
+# Dijkstra's queue can be a set of buckets, one per distance (Dial's algorithm). Every
+# cell in the lowest bucket is final at once, and the whole bucket is relaxed together
+# with a handful of array operations, so the work per step follows the width of the
+# wavefront rather than the number of cells in it. The grid is padded with a ring of
+# obstacles so that neighbors are plain id offsets and need no bounds checks.
+
+def distance_field(grid, sources, targets=None, limit=None, reverse=False):
+    """Least cost from any of sources, (x, y) cells, to every cell, as an H x W float64
+    array with inf where unreachable. Moving from u costs grid[u] and needs the next cell
+    traversable. With reverse, the least cost from every cell to any of sources instead
+    (an obstacle, left at no cost, gets the least value among its neighbors). The sweep
+    stops once every cell of targets, (N, 2) cells or an H x W boolean mask, is final, or
+    once distances pass limit; cells not final by then are inf."""
+    costs = np.asarray(grid.grid)
+    if costs.dtype.kind not in "ui":
+        raise ValueError("distance fields need integer costs")
+    height, width = costs.shape
+    stride = width + 2
+    padded = np.zeros((height + 2, stride), dtype=np.int64)
+    padded[1:-1, 1:-1] = costs
+    padded = padded.reshape(-1)
+    free = padded != 0
+    offsets = np.array([dx * stride + dy for dx, dy in grid.directions()], dtype=np.int64)
+    dist = np.full(len(padded), np.inf)
+    final = np.zeros(len(padded), dtype=bool)
+
+    def ids(cells):
+        cells = np.asarray(cells, dtype=np.int64).reshape(-1, 2)
+        return (cells[:, 0] + 1) * stride + cells[:, 1] + 1
+
+    goal = np.zeros(len(padded), dtype=bool)
+    if targets is not None:
+        targets = np.asarray(targets)
+        if targets.dtype == bool and targets.shape == (height, width):
+            goal.reshape(height + 2, stride)[1:-1, 1:-1] = targets
+        else:
+            goal[ids(targets)] = True
+    pending = np.count_nonzero(goal)
+
+    start = np.unique(ids(sources))
+    dist[start] = 0
+    buckets = {0: [start]}
+    keys = [0]
+    while keys:
+        t = heapq.heappop(keys)
+        if limit is not None and t > limit:
+            break
+        parts = buckets.pop(t)
+        cells = parts[0] if len(parts) == 1 else np.unique(np.concatenate(parts))
+        cells = cells[(dist[cells] == t) & ~final[cells]]
+        if not len(cells):
+            continue
+        final[cells] = True
+        if targets is not None:
+            pending -= np.count_nonzero(goal[cells])
+            if pending <= 0:
+                break
+        if reverse:
+            # Only a traversable cell can be moved into, so only it has predecessors.
+            cells = cells[free[cells]]
+            near = (cells[:, None] + offsets).reshape(-1)
+            cand = t + padded[near]
+        else:
+            near = (cells[:, None] + offsets).reshape(-1)
+            cand = np.repeat(t + padded[cells], len(offsets))
+            keep = free[near]
+            near, cand = near[keep], cand[keep]
+        better = (cand < dist[near]) & ~final[near]
+        near, cand = near[better], cand[better]
+        if not len(near):
+            continue
+        order = np.lexsort((cand, near))
+        near, cand = near[order], cand[order]
+        first = np.flatnonzero(np.diff(near, prepend=-1))
+        near, cand = near[first], cand[first]
+        dist[near] = cand
+        order = np.argsort(cand, kind="stable")
+        near, cand = near[order], cand[order]
+        starts = np.flatnonzero(np.diff(cand, prepend=-1)).tolist()
+        for lo, hi in zip(starts, starts[1:] + [len(cand)]):
+            value = int(cand[lo])
+            if value not in buckets:
+                buckets[value] = []
+                heapq.heappush(keys, value)
+            buckets[value].append(near[lo:hi])
+
+    dist[~final] = np.inf
+    return dist.reshape(height + 2, stride)[1:-1, 1:-1].copy()
+
+def main(argv=None):
+    # Benchmark imports Landmarks, which builds its fields here.
+    import Benchmark
+    parser = argparse.ArgumentParser(description="Time whole-grid distance fields against the array Dijkstra.")
+    parser.add_argument("--size", type=int, default=1000)
+    parser.add_argument("--density", type=float, default=0.2)
+    parser.add_argument("--connectivity", type=int, default=8, choices=[4, 8])
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    grid, start, goal = Benchmark.make_instance(args.size, args.density, args.connectivity, args.seed)
+    began = time.perf_counter()
+    field = distance_field(grid, [start])
+    print(f"wavefront: {time.perf_counter() - began:.3f}s")
+    began = time.perf_counter()
+    space = ArraySearch.SearchSpace(grid)
+    ArraySearch.weighted_A_star(space, grid.state_id(start), -1, lambda v: 0, 1)
+    print(f"array Dijkstra: {time.perf_counter() - began:.3f}s")
+    expected = np.frombuffer(space.g, dtype=np.float64).reshape(field.shape)
+    print("fields match" if np.array_equal(field, expected) else "FIELDS DIFFER")
+    began = time.perf_counter()
+    middle = (args.size // 2, args.size // 2)
+    partial = distance_field(grid, [start], targets=[middle])
+    print(f"until {middle} is final: {time.perf_counter() - began:.3f}s, cost {partial[middle]}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
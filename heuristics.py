@@ -1,4 +1,6 @@
 import math
+import numpy as np
+from collections import OrderedDict
 
 def heuristic_manhattan(node, goal):
     return abs(node[0] - goal[0]) + abs(node[1] - goal[1])
@@ -14,6 +16,151 @@ def heuristic_octile(node, goal):
     dy = abs(node[1] - goal[1])
     return (dx + dy) + (math.sqrt(2) - 2) * min(dx, dy)
 
+# Batch variants: states is an (N, 2) array of (x, y) cells, or an (xs, ys) pair of
+# arrays that broadcast against each other; the result has the broadcast shape.
+def coords(states):
+    if isinstance(states, tuple):
+        return states
+    states = np.asarray(states)
+    return states[..., 0], states[..., 1]
+
+def manhattan_batch(states, goal):
+    xs, ys = coords(states)
+    return np.abs(xs - goal[0]) + np.abs(ys - goal[1])
+
+def euclidean_batch(states, goal):
+    xs, ys = coords(states)
+    return np.hypot(xs - goal[0], ys - goal[1])
+
+def chebyshev_batch(states, goal):
+    xs, ys = coords(states)
+    return np.maximum(np.abs(xs - goal[0]), np.abs(ys - goal[1]))
+
+def octile_batch(states, goal):
+    xs, ys = coords(states)
+    dx = np.abs(xs - goal[0])
+    dy = np.abs(ys - goal[1])
+    return (dx + dy) + (math.sqrt(2) - 2) * np.minimum(dx, dy)
+
+BATCH = {
+    heuristic_manhattan: manhattan_batch,
+    heuristic_euclidean: euclidean_batch,
+    heuristic_chebyshev: chebyshev_batch,
+    heuristic_octile: octile_batch,
+}
+
+# Heuristics that only take integer values, and those that are consistent on a grid with
+# the given connectivity when every traversable cell costs at least 1.
+INTEGRAL = {heuristic_manhattan, heuristic_chebyshev}
+CONSISTENT = {
+    4: {heuristic_manhattan, heuristic_euclidean, heuristic_chebyshev, heuristic_octile},
+    8: {heuristic_chebyshev},
+}
+
+def is_integral(h):
+    return h in INTEGRAL or getattr(h, "integral", False)
+
+def is_consistent(h, connectivity):
+    return h in CONSISTENT.get(connectivity, ()) or getattr(h, "consistent", False)
+
+def batch(h):
+    if h in BATCH:
+        return BATCH[h]
+    if hasattr(h, "batch"):
+        return h.batch
+    def loop(states, goal):
+        xs, ys = np.broadcast_arrays(*coords(states))
+        values = [h(state, goal) for state in zip(xs.ravel().tolist(), ys.ravel().tolist())]
+        return np.array(values, dtype=float).reshape(xs.shape)
+    return loop
+
+def tabled(h):
+    """Whether whole-grid tables of h come cheap: h is vectorized or keeps its own. Any
+    other h would fill a table one Python call per cell, however few cells a search sees."""
+    return h in BATCH or hasattr(h, "batch") or hasattr(h, "table")
+
+def states_from_ids(ids, width):
+    return np.stack(np.divmod(np.asarray(ids, dtype=np.int64), width), axis=-1)
+
+# LRU cache of whole-grid heuristic tables, one H x W array per (heuristic, goal, shape),
+# bounded by the total size of the cached arrays.
+class HeuristicTables:
+    def __init__(self, max_bytes=256 * 2**20):
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self.tables = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, h, goal, shape):
+        # Heuristics that keep whole-grid fields of their own serve them directly; those
+        # may be stored compactly, so readers widen what they take out to float64.
+        if hasattr(h, "table"):
+            return h.table(goal, shape)
+        key = (h, tuple(goal), tuple(shape))
+        table = self.tables.get(key)
+        if table is not None:
+            self.tables.move_to_end(key)
+            self.hits += 1
+            return table
+        if shape[0] * shape[1] * 8 > self.max_bytes:
+            return None
+        self.misses += 1
+        xs, ys = np.ogrid[:shape[0], :shape[1]]
+        table = np.ascontiguousarray(np.broadcast_to(batch(h)((xs, ys), goal), shape), dtype=np.float64)
+        table.flags.writeable = False
+        self.tables[key] = table
+        self.nbytes += table.nbytes
+        while self.nbytes > self.max_bytes:
+            _, evicted = self.tables.popitem(last=False)
+            self.nbytes -= evicted.nbytes
+        return table
+
+    def discard(self, h):
+        """Drop every table of h, for heuristics whose values change with the grid."""
+        for key in [key for key in self.tables if key[0] is h]:
+            self.nbytes -= self.tables.pop(key).nbytes
+
+    def clear(self):
+        self.tables.clear()
+        self.nbytes = 0
+
+TABLES = HeuristicTables()
+
+# Heuristic callable that reads from the TABLES entry for the current goal when the grid
+# shape is known and h is tabled, and falls back to calling h directly otherwise. Heuristics whose values
+# follow the grid carry a version, and the table is fetched again when it moves.
+class Lookup:
+    def __init__(self, h, shape=None, tables=TABLES):
+        self.h = h
+        self.shape = shape
+        self.tables = tables
+        self.goal = None
+        self.version = None
+        self.table = None
+
+    def field(self, goal):
+        if self.shape is None or not tabled(self.h):
+            return None
+        version = getattr(self.h, "version", None)
+        if goal != self.goal or version != self.version:
+            self.goal, self.version = goal, version
+            self.table = self.tables.get(self.h, goal, self.shape)
+        return self.table
+
+    def __call__(self, state, goal):
+        table = self.field(goal)
+        if table is None:
+            return self.h(state, goal)
+        return table.item(state)
+
+    def batch(self, states, goal):
+        table = self.field(goal)
+        if table is None:
+            return batch(self.h)(states, goal)
+        xs, ys = coords(states)
+        return table[xs, ys].astype(np.float64)
+
 def linear(C, h_n, g_n):
     if h_n == 0:
         return 0
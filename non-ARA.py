@@ -2,7 +2,7 @@ import math
 import Util
 
 def heuristic_search_single(grid, start, goal, priority):
-    open = Util.PQ()
+    open = Util.IndexedPQ()
     open_set = set([start.state])
     closed_anchor = set()
     open.push((start), priority(start))
@@ -22,7 +22,7 @@ def heuristic_search_single(grid, start, goal, priority):
     return None, open_set, closed_anchor, None
 
 def heuristic_search_multi(grid, start, goal, priorities):
-    open = [Util.PQ() for _ in range(len(priorities))]
+    open = [Util.IndexedPQ() for _ in range(len(priorities))]
     open_sets = [set([start.state]) for _ in range(len(priorities))]
     closed_anchor = set()
     closed_inad = set()
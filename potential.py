@@ -12,17 +12,21 @@ def linear(C, h_n, g_n):
 def additive(C, h_n, g_n):
     return h_n + g_n
 
-def potential_search(grid, start, goal, budget, cost_model, h):
+def potential_search(grid, start, goal, budget, cost_model, h, incumbent=None, deadline=None):
     """
     Potential Search with support for different cost models: additive, linear relative, and general invertible.
     """
-    open_list = Util.PQ()
+    if not grid.path_exists(start, goal):
+        return None, {start.state}, set(), None
+    open_list = Util.IndexedPQ()
     open_list.push((start), 0)
     open_set = {start.state}
     closed_set = set()
     final_cost = None
 
     while not open_list.isEmpty():
+        if deadline is not None and deadline.expired():
+            break
         current_node = open_list.pop()
         open_set.remove(current_node.state)
         closed_set.add(current_node.state)
@@ -42,6 +46,8 @@ def potential_search(grid, start, goal, budget, cost_model, h):
 
             if neighbor.state not in closed_set and neighbor.g_score <= budget:
                 h_score = h(neighbor.state, goal)
+                if incumbent is not None and g_score + h_score >= incumbent.cost:
+                    continue
                 potential = cost_model(budget, h_score, g_score)
                 open_list.update((neighbor), potential)
                 open_set.add(neighbor.state)